@@ -1,22 +1,33 @@
-from flask import Flask, render_template, request, jsonify, send_file
-import os
+from flask import Blueprint, Flask, Response, render_template, request, jsonify, send_file
 from PIL import Image
 import base64
+import functools
+import hashlib
 import io
 import json
+import lzma
+import math
+import multiprocessing
+import os
+import random
+import re
+import sqlite3
+import tempfile
+import threading
+import uuid
+import weakref
+import zipfile
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing import resource_tracker, shared_memory
+from urllib.parse import quote
 import numpy as np
+import struct
 import time
-import psutil
-import tracemalloc
-from werkzeug.utils import secure_filename
+from contextlib import contextmanager
 
-app = Flask(__name__)
-app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-
-# Create uploads directory if it doesn't exist
-if not os.path.exists(app.config['UPLOAD_FOLDER']):
-    os.makedirs(app.config['UPLOAD_FOLDER'])
+MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
 
 # Steganography Implementation
 # Membuat tabel karakter (62 karakter)
@@ -25,215 +36,1471 @@ REVERSE_CHAR_TABLE = {}
 
 # Inisialisasi tabel karakter
 def init_char_table():
+    # Tabel disusun lengkap di dict lokal lalu disalin sekaligus, sehingga
+    # pemanggilan ulang hanya menimpa nilai yang sama
+    chars = {}
+
     # Angka 0-9 (index 0-9)
     for i in range(10):
-        CHAR_TABLE[str(i)] = i
-        REVERSE_CHAR_TABLE[i] = str(i)
+        chars[str(i)] = i
     
     # Huruf kecil a-z (index 10-35)
     for i, char in enumerate(range(ord('a'), ord('z') + 1)):
-        CHAR_TABLE[chr(char)] = i + 10
-        REVERSE_CHAR_TABLE[i + 10] = chr(char)
+        chars[chr(char)] = i + 10
     
     # Huruf besar A-Z (index 36-61)
     for i, char in enumerate(range(ord('A'), ord('Z') + 1)):
-        CHAR_TABLE[chr(char)] = i + 36
-        REVERSE_CHAR_TABLE[i + 36] = chr(char)
+        chars[chr(char)] = i + 36
+
+    CHAR_TABLE.update(chars)
+    REVERSE_CHAR_TABLE.update({value: char for char, value in chars.items()})
+
+# Tabel diisi saat import (beberapa mikrodetik): thread request tidak pernah
+# melihat tabel setengah terisi, dan cipher_table tidak meng-cache tabel salah
+init_char_table()
+
+@functools.lru_cache(maxsize=None)
+def cipher_table(shift):
+    """Membuat tabel translasi 256 byte untuk pergeseran shift (mod 62), di-cache per kunci"""
+    table = bytearray(range(256))
+    for char, val in CHAR_TABLE.items():
+        table[ord(char)] = ord(REVERSE_CHAR_TABLE[(val + shift) % 62])
+    return bytes(table)
+
+def apply_cipher(text, shift):
+    """Menerapkan pergeseran shift ke seluruh teks (atau bytes) dalam satu lintasan"""
+    # Byte multi-byte UTF-8 selalu >= 0x80 sehingga tidak tersentuh tabel,
+    # karakter di luar tabel tetap dibiarkan apa adanya
+    if not isinstance(text, str):
+        # Payload biner (bytes/bytearray/memoryview): byte ASCII alfanumerik digeser
+        return bytes(text).translate(cipher_table(shift % 62))
+    data = text.encode('utf-8', 'surrogatepass')
+    return data.translate(cipher_table(shift % 62)).decode('utf-8', 'surrogatepass')
 
 def encrypt_custom(text, key):
     """Mengenkripsi teks menggunakan metode custom"""
-    result = ""
-    for char in text:
-        if char in CHAR_TABLE:
-            # C = (P + K) mod 62
-            p_val = CHAR_TABLE[char]
-            c_val = (p_val + key) % 62
-            result += REVERSE_CHAR_TABLE[c_val]
-        else:
-            result += char
-    return result
+    # C = (P + K) mod 62
+    return apply_cipher(text, key)
 
 def decrypt_custom(cipher_text, key):
     """Mendekripsi teks menggunakan metode custom"""
-    result = ""
-    for char in cipher_text:
-        if char in CHAR_TABLE:
-            # P = (C - K) mod 62
-            c_val = CHAR_TABLE[char]
-            p_val = (c_val - key) % 62
-            result += REVERSE_CHAR_TABLE[p_val]
-        else:
-            result += char
-    return result
+    # P = (C - K) mod 62
+    return apply_cipher(cipher_text, -key)
 
 def text_to_binary(text):
-    """Mengkonversi teks ke binary"""
-    binary = ''.join(format(ord(char), '08b') for char in text)
-    return binary
+    """Mengkonversi teks (UTF-8) atau bytes ke array bit numpy"""
+    if isinstance(text, str):
+        text = text.encode('utf-8')
+    return bytes_to_bits(text)
+
+# Header payload berversi: magic, versi format, flags, id cipher, panjang payload (byte)
+HEADER_MAGIC = b'STG'
+HEADER_VERSION = 1
+HEADER_FORMAT = '>3sBBBI'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+HEADER_BITS = HEADER_SIZE * 8
+
+# Id cipher yang tercatat di header; decode hanya mendukung SUPPORTED_CIPHERS
+CIPHER_NONE = 0
+CIPHER_CUSTOM = 1
+SUPPORTED_CIPHERS = (CIPHER_CUSTOM,)
+
+# Flags header: bit 0-1 berisi (jumlah bit LSB per kanal - 1) untuk payload.
+# Header sendiri selalu disisipkan 1 bit per kanal
+FLAG_DEPTH_MASK = 0x03
+LSB_DEPTHS = (1, 2, 3, 4)
+
+# Flags header: bit 4 menandai payload berupa lampiran biner (bukan teks)
+FLAG_ATTACHMENT = 0x10
+ATTACHMENT_NAME_FORMAT = '>H'  # Panjang nama file lampiran di awal payload
+ATTACHMENT_NAME_SIZE = struct.calcsize(ATTACHMENT_NAME_FORMAT)
+DEFAULT_ATTACHMENT_NAME = 'attachment.bin'
+
+# Flags header: bit 5-6 berisi jumlah kanal gambar yang disisipi, disimpan
+# sebagai (kanal - 3) mod 4 sehingga nilai 0 berarti RGB (header lama tetap valid)
+FLAG_CHANNELS_SHIFT = 5
+FLAG_CHANNELS_MASK = 0x60
+
+# Flags header: bit 7 menandai payload tersebar di posisi yang dipilih PRNG
+# dengan seed dari kunci; header sendiri tetap berurutan di awal gambar
+FLAG_SCATTER = 0x80
+SCATTER_SALT = b'stego-scatter:'
+
+# Flags header: bit 2-3 berisi id kompresi payload (indeks di COMPRESSION_MODES)
+FLAG_COMPRESSION_SHIFT = 2
+FLAG_COMPRESSION_MASK = 0x0C
+COMPRESSION_MODES = ('none', 'zlib', 'lzma')
+COMPRESSION_LEVELS = range(0, 10)  # zlib level / preset lzma
+DEFAULT_COMPRESSION_LEVEL = 6
+DECOMPRESS_LIMIT = 64 * 1024 * 1024  # Batas hasil dekompresi agar payload rusak tidak meledak
+
+def build_header(length, flags=0, cipher=CIPHER_CUSTOM, depth=1, compression='none', channels=3):
+    """Membuat header biner untuk payload sepanjang length byte"""
+    flags = (flags & ~(FLAG_DEPTH_MASK | FLAG_COMPRESSION_MASK | FLAG_CHANNELS_MASK)) | (depth - 1)
+    flags |= COMPRESSION_MODES.index(compression) << FLAG_COMPRESSION_SHIFT
+    flags |= ((channels - 3) % 4) << FLAG_CHANNELS_SHIFT
+    return struct.pack(HEADER_FORMAT, HEADER_MAGIC, HEADER_VERSION, flags, cipher, length)
+
+def parse_header(data):
+    """Membaca header biner, mengembalikan dict atau None jika bukan header"""
+    magic, version, flags, cipher, length = struct.unpack(HEADER_FORMAT, data[:HEADER_SIZE])
+    if magic != HEADER_MAGIC or version != HEADER_VERSION:
+        return None
+    compression = (flags & FLAG_COMPRESSION_MASK) >> FLAG_COMPRESSION_SHIFT
+    if compression >= len(COMPRESSION_MODES):
+        return None
+    return {
+        'version': version,
+        'flags': flags,
+        'cipher': cipher,
+        'length': length,
+        'depth': (flags & FLAG_DEPTH_MASK) + 1,
+        'compression': COMPRESSION_MODES[compression],
+        'attachment': bool(flags & FLAG_ATTACHMENT),
+        'scatter': bool(flags & FLAG_SCATTER),
+        'channels': (((flags & FLAG_CHANNELS_MASK) >> FLAG_CHANNELS_SHIFT) + 2) % 4 + 1
+    }
+
+def is_attachment(secret):
+    """Cek apakah secret berupa payload biner (bytes/bytearray/memoryview), bukan teks"""
+    return isinstance(secret, (bytes, bytearray, memoryview))
+
+def build_payload(secret, key, filename=None):
+    """Menyusun payload terenkripsi: teks UTF-8 atau lampiran biner beserta nama file"""
+    # Teks:     cipher(teks UTF-8) | key |
+    # Lampiran: panjang nama (2 byte) + cipher(nama + isi file) | key |
+    suffix = f"|{key}|".encode('utf-8')
+    if not is_attachment(secret):
+        return encrypt_custom(secret, key).encode('utf-8') + suffix
+    name = (filename or DEFAULT_ATTACHMENT_NAME).encode('utf-8')
+    body = bytearray(name)
+    body += secret
+    return struct.pack(ATTACHMENT_NAME_FORMAT, len(name)) + encrypt_custom(body, key) + suffix
+
+def split_payload(payload, attachment):
+    """Memisahkan payload menjadi (isi terenkripsi, kunci tersimpan, panjang nama lampiran)"""
+    if not attachment:
+        encrypted_text, stored_key, _ = payload.decode('utf-8').rsplit('|', 2)
+        return encrypted_text, int(stored_key), None
+    name_length, = struct.unpack_from(ATTACHMENT_NAME_FORMAT, payload)
+    body, stored_key, _ = payload[ATTACHMENT_NAME_SIZE:].rsplit(b'|', 2)
+    return body, int(stored_key), name_length
+
+def compress_payload(data, compression='none', level=DEFAULT_COMPRESSION_LEVEL):
+    """Mengompresi payload, mengembalikan (data, kompresi yang dipakai)"""
+    if compression == 'zlib':
+        packed = zlib.compress(data, level)
+    elif compression == 'lzma':
+        packed = lzma.compress(data, preset=level)
+    elif compression == 'none':
+        return data, 'none'
+    else:
+        raise ValueError(f"Mode kompresi tidak valid: {compression}")
+    # Payload pendek atau acak bisa membesar; simpan mentah jika tidak lebih kecil
+    if len(packed) >= len(data):
+        return data, 'none'
+    return packed, compression
+
+def decompress_payload(data, compression):
+    """Mendekompresi payload sesuai id kompresi di header"""
+    if compression == 'none':
+        return data
+    if compression == 'zlib':
+        decompressor = zlib.decompressobj()
+    else:
+        decompressor = lzma.LZMADecompressor()
+    result = decompressor.decompress(data, DECOMPRESS_LIMIT)
+    if not decompressor.eof:
+        raise ValueError("Payload terkompresi rusak atau melebihi batas ukuran")
+    return result
+
+def bytes_to_bits(data):
+    """Mengkonversi bytes ke array bit numpy"""
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+
+def values_needed(length, depth=1):
+    """Jumlah nilai kanal untuk menyimpan length byte dengan depth bit per kanal"""
+    return -(-length * 8 // depth)
+
+def pixel_shape(img):
+    """Lebar, tinggi dan jumlah kanal dari gambar PIL atau array pixel numpy"""
+    if isinstance(img, np.ndarray):
+        return img.shape[1], img.shape[0], img.shape[2] if img.ndim == 3 else 1
+    return img.size[0], img.size[1], len(img.getbands())
+
+def scatter_seed(key):
+    """Seed PRNG posisi payload tersebar, diturunkan dari kunci"""
+    return int.from_bytes(hashlib.sha256(SCATTER_SALT + str(key).encode('utf-8')).digest()[:8], 'big')
+
+def splitmix64(seed, count):
+    """count bilangan 64 bit SplitMix64 (mode counter) dari seed, dihitung vektor dengan numpy"""
+    # Aritmetika uint64 numpy membungkus mod 2**64 seperti implementasi acuan.
+    # Deret ini ditentukan rumusnya sendiri, tidak seperti np.random.Generator
+    # yang keluarannya boleh berubah antar versi numpy (NEP 19)
+    z = np.uint64(seed) + np.arange(1, count + 1, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+def scatter_positions(key, count, total_values):
+    """Posisi (terurut) count nilai kanal payload tersebar di antara nilai HEADER_BITS..total_values"""
+    # Area setelah header dibagi menjadi count strata sama besar dan satu posisi
+    # diambil acak per stratum: hanya count indeks yang dibuat (tanpa permutasi
+    # seluruh pixel), posisi tersebar ke seluruh gambar dan tidak pernah sama.
+    # Offset ke-i = SplitMix64 ke-i mod lebar stratum; bias modulo <= lebar / 2**64
+    available = total_values - HEADER_BITS
+    if count > available:
+        raise ValueError("Pesan terlalu panjang untuk gambar ini")
+    edges = HEADER_BITS + np.arange(count + 1, dtype=np.int64) * available // count
+    offsets = splitmix64(scatter_seed(key), count) % np.diff(edges).astype(np.uint64)
+    return edges[:-1] + offsets.astype(np.int64)
+
+def read_lsb_bytes(img, offset, length, depth=1, memory_budget=None, positions=None):
+    """Membaca length byte dari depth bit terbawah gambar PIL (atau array numpy) mulai dari nilai kanal ke-offset"""
+    # positions (terurut) menggantikan offset untuk payload tersebar
+    if positions is not None:
+        return read_lsb_at_positions(img, positions, length, depth, memory_budget)
+    start, stop = offset, offset + values_needed(length, depth)
+    if isinstance(img, np.ndarray):
+        # Array pixel dibaca langsung tanpa salinan pita
+        values = (img.reshape(-1)[start:stop] & ((1 << depth) - 1)).astype(np.uint8)
+        return lsb_to_bytes(values, length, depth)
+
+    # Hanya baris yang memuat payload yang disalin, per pita baris
+    width = img.size[0]
+    row_values = width * len(img.getbands())
+    band_rows = strip_rows(img, memory_budget or STRIP_MEMORY_BUDGET, values_factor=2)
+    values = np.empty(stop - start, dtype=np.uint8)
+    for top in range(start // row_values, -(-stop // row_values), band_rows):
+        band = np.asarray(img.crop((0, top, width, min(top + band_rows, img.size[1])))).reshape(-1)
+        base = top * row_values
+        lo, hi = max(start, base), min(stop, base + band.size)
+        values[lo - start:hi - start] = band[lo - base:hi - base] & ((1 << depth) - 1)
+    return lsb_to_bytes(values, length, depth)
+
+def read_lsb_at_positions(img, positions, length, depth=1, memory_budget=None):
+    """Membaca length byte dari depth bit terbawah nilai kanal di posisi terurut"""
+    mask = (1 << depth) - 1
+    if isinstance(img, np.ndarray):
+        return lsb_to_bytes((img.reshape(-1)[positions] & mask).astype(np.uint8), length, depth)
+
+    # Gambar PIL: gather per pita baris, posisi tiap pita dicari dengan searchsorted
+    width, height = img.size
+    row_values = width * len(img.getbands())
+    band_rows = strip_rows(img, memory_budget or STRIP_MEMORY_BUDGET, values_factor=2)
+    values = np.empty(positions.size, dtype=np.uint8)
+    for top in range(int(positions[0]) // row_values, int(positions[-1]) // row_values + 1, band_rows):
+        bottom = min(top + band_rows, height)
+        lo, hi = np.searchsorted(positions, (top * row_values, bottom * row_values))
+        if lo == hi:
+            continue
+        band = np.asarray(img.crop((0, top, width, bottom))).reshape(-1)
+        values[lo:hi] = band[positions[lo:hi] - top * row_values] & mask
+    return lsb_to_bytes(values, length, depth)
+
+def lsb_to_bytes(values, length, depth=1):
+    """Menyusun length byte dari nilai depth bit per kanal"""
+    if depth == 1:
+        bits = values
+    else:
+        # Setiap nilai memuat depth bit payload, bit paling signifikan dulu
+        bits = np.unpackbits(values[:, None], axis=1)[:, 8 - depth:].reshape(-1)
+    return np.packbits(bits[:length * 8]).tobytes()
+
+def read_header(img):
+    """Membaca header dari awal gambar PIL (atau array numpy), None jika gambar memakai format lama"""
+    width, height, channels = pixel_shape(img)
+    total_values = width * height * channels
+    if total_values < HEADER_BITS:
+        return None
+    header = parse_header(read_lsb_bytes(img, 0, HEADER_SIZE))
+    if header is not None and header['channels'] != channels:
+        raise ValueError(f"Gambar memiliki {channels} kanal, header mencatat "
+                         f"{header['channels']} (gambar sudah dikonversi?)")
+    if header is not None and HEADER_BITS + values_needed(header['length'], header['depth']) > total_values:
+        raise ValueError("Panjang payload pada header melebihi kapasitas gambar")
+    return header
+
+EMBEDDING_CHANNELS = 3  # Jumlah kanal default (RGB)
+
+# Mode gambar yang disisipi langsung tanpa konversi, beserta nilai sampel maksimum
+# untuk PSNR. Mode lain dikonversi dulu (P -> RGB/RGBA, 1 -> L, sisanya -> RGB)
+NATIVE_MODES = {
+    'L': 255,
+    'LA': 255,
+    'RGB': 255,
+    'RGBA': 255,
+    'I;16': 65535,
+    'I': 65535  # PNG grayscale 16 bit dibuka Pillow sebagai mode I
+}
+
+def embedding_mode(img):
+    """Mode gambar tempat payload disisipi, sama dengan mode asli jika didukung"""
+    if img.mode in NATIVE_MODES:
+        return img.mode
+    if img.mode in ('P', 'PA'):
+        return 'RGBA' if img.mode == 'PA' or 'transparency' in img.info else 'RGB'
+    if img.mode == '1':
+        return 'L'
+    return 'RGB'
+
+def capacity_mode(depth):
+    """Nama mode kapasitas untuk depth bit per kanal: 'lsb', 'lsb2', 'lsb3', 'lsb4'"""
+    return 'lsb' if depth == 1 else f'lsb{depth}'
+
+def embedding_capacity(width, height, channels=EMBEDDING_CHANNELS):
+    """Kapasitas payload maksimum (byte) per depth untuk ukuran gambar tertentu"""
+    # Hanya format header yang bisa ditulis encoder; format lama (payload +
+    # delimiter 16 bit) hanya dibaca saat decode sehingga tidak punya kapasitas
+    total_values = width * height * channels
+    return {capacity_mode(depth): max(total_values - HEADER_BITS, 0) * depth // 8
+            for depth in LSB_DEPTHS}
+
+def payload_size(secret_text, key, filename=None):
+    """Ukuran payload (byte) untuk pesan atau lampiran dan kunci tertentu, tanpa header"""
+    # Cipher memetakan byte ASCII ke ASCII, jadi panjang byte tidak berubah
+    if is_attachment(secret_text):
+        name = (filename or DEFAULT_ATTACHMENT_NAME).encode('utf-8')
+        return ATTACHMENT_NAME_SIZE + len(name) + memoryview(secret_text).nbytes + len(f"|{key}|")
+    return len(secret_text.encode('utf-8')) + len(f"|{key}|")
+
+def image_capacity(image, key=None):
+    """Membaca ukuran dan mode dari header gambar saja (tanpa decode pixel) lalu menghitung kapasitas"""
+    img = open_image(image)
+    width, height = img.size
+    capacity = {
+        'width': width,
+        'height': height,
+        'mode': img.mode,
+        'format': img.format,
+        'embedding_mode': embedding_mode(img),
+        'capacity': embedding_capacity(width, height, Image.getmodebands(embedding_mode(img)))
+    }
+    if key is not None:
+        # Sisa kapasitas untuk pesan setelah separator dan kunci
+        overhead = payload_size('', key)
+        capacity['max_message_bytes'] = max(capacity['capacity']['lsb'] - overhead, 0)
+        capacity['max_message_bytes_by_depth'] = {
+            depth: max(capacity['capacity'][capacity_mode(depth)] - overhead, 0)
+            for depth in LSB_DEPTHS
+        }
+    return capacity
+
+def open_image(source):
+    """Membuka gambar dari path, file-like object, bytes, array numpy, atau PIL Image"""
+    if isinstance(source, Image.Image):
+        return source
+    if isinstance(source, np.ndarray):
+        return Image.fromarray(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    return Image.open(source)
+
+# Encoder keluaran lossless: format Pillow, mimetype, ekstensi, dan mode gambar
+# yang bisa disimpan tanpa kehilangan bit LSB (None berarti semua mode)
+OUTPUT_FORMATS = {
+    'png': {'format': 'PNG', 'mimetype': 'image/png', 'extension': '.png', 'modes': None},
+    'webp': {'format': 'WEBP', 'mimetype': 'image/webp', 'extension': '.webp',
+             'modes': ('RGB', 'RGBA')},
+    'bmp': {'format': 'BMP', 'mimetype': 'image/bmp', 'extension': '.bmp', 'modes': ('L', 'RGB')},
+    'tiff': {'format': 'TIFF', 'mimetype': 'image/tiff', 'extension': '.tif', 'modes': None}
+}
+COMPRESS_LEVELS = range(0, 10)
+
+# Default per deployment; bisa diganti per request. Level 6 sama dengan default
+# Pillow, level 1 jauh lebih cepat dengan file sedikit lebih besar, 0 tanpa kompresi
+OUTPUT_FORMAT = os.environ.get('STEGO_OUTPUT_FORMAT', 'png').lower()
+OUTPUT_COMPRESS_LEVEL = int(os.environ.get('STEGO_OUTPUT_COMPRESS_LEVEL', 6))
+
+def encoder_options(format, compress_level):
+    """Argumen Image.save untuk encoder keluaran dan level kompresi 0-9"""
+    if format == 'png':
+        return {'compress_level': compress_level}
+    if format == 'webp':
+        # Lossless; exact mempertahankan RGB di bawah alpha 0. Level 0-9
+        # dipetakan ke method 0-6 (level 6 = method 4, default libwebp)
+        return {'lossless': True, 'exact': True, 'method': compress_level * 6 // 9}
+    # BMP dan TIFF disimpan tanpa kompresi
+    return {}
+
+def output_format_for(mode, output_format=None):
+    """Format keluaran untuk gambar mode tertentu: format yang diminta, atau default deployment"""
+    # Dipanggil sebelum penyisipan. Default deployment (STEGO_OUTPUT_FORMAT)
+    # yang tidak bisa menyimpan mode ini diganti PNG; format yang diminta
+    # secara eksplisit tetapi tidak cocok ditolak dengan ValueError
+    requested = output_format is not None
+    output_format = (output_format or OUTPUT_FORMAT).lower()
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Format keluaran tidak valid: {output_format}")
+    modes = OUTPUT_FORMATS[output_format]['modes']
+    if modes is None or mode in modes:
+        return output_format
+    if not requested:
+        return 'png'
+    raise ValueError(f"Format {output_format} tidak bisa menyimpan gambar mode {mode} "
+                     f"tanpa mengubah LSB")
+
+def image_to_bytes(image, format=None, compress_level=None):
+    """Meng-encode array numpy atau PIL Image ke bytes (default OUTPUT_FORMAT, PNG)"""
+    if isinstance(image, np.ndarray):
+        image = Image.fromarray(image)
+    if format is None:
+        format = output_format_for(image.mode)
+    format = format.lower()
+    if format not in OUTPUT_FORMATS:
+        raise ValueError(f"Format keluaran tidak valid: {format}")
+    if compress_level is None:
+        compress_level = OUTPUT_COMPRESS_LEVEL
+    encoder = OUTPUT_FORMATS[format]
+    with stage_timer('encode', 'save'):
+        if encoder['modes'] is not None and image.mode not in encoder['modes']:
+            raise ValueError(f"Format {format} tidak bisa menyimpan gambar mode {image.mode} "
+                             f"tanpa mengubah LSB")
+        buffer = io.BytesIO()
+        image.save(buffer, encoder['format'], **encoder_options(format, compress_level))
+        return buffer.getvalue()
+
+# Mode perhitungan metrik kualitas: none (lewati) atau fast (hanya nilai yang
+# disisipi; nilai lain identik, jadi hasilnya eksak untuk seluruh gambar)
+METRICS_MODES = ('none', 'fast')
+
+def calculate_squared_error(cover_array, stego_array):
+    """Menghitung jumlah kuadrat selisih dua array numpy dalam satu lintasan"""
+    # Selisih dihitung dengan dtype lebar agar tidak terjadi wrap-around uint8
+    diff = np.subtract(cover_array, stego_array, dtype=np.int32).reshape(-1)
+    return int(np.einsum('i,i->', diff, diff, dtype=np.int64))
+
+def quality_from_squared_error(squared_error, total_size, max_pixel=255.0):
+    """Menghitung MSE dan PSNR dari jumlah kuadrat selisih"""
+    mse = squared_error / total_size
+    if mse == 0:
+        psnr = float('inf')
+    else:
+        psnr = float(20 * np.log10(max_pixel / np.sqrt(mse)))
+    return mse, psnr
+
+def calculate_quality(cover_array, stego_array, total_size=None):
+    """Menghitung MSE dan PSNR dari dua array numpy dalam satu lintasan"""
+    squared_error = calculate_squared_error(cover_array, stego_array)
+    return quality_from_squared_error(squared_error, total_size or stego_array.size)
+
+def report_progress(progress, **fields):
+    """Memanggil callback progress (jika ada) dengan informasi tahap proses"""
+    if progress is not None:
+        progress(**fields)
+
+# Batas memori kerja (byte) untuk pita baris yang diproses sekaligus oleh
+# engine strip; baris yang tidak disisipi tidak pernah disalin
+STRIP_MEMORY_BUDGET = int(os.environ.get('STEGO_STRIP_MEMORY_BUDGET', 64 * 1024 * 1024))
+
+def payload_bits(data, start, stop):
+    """Mengambil bit ke-start sampai ke-stop dari bytes tanpa meng-unpack seluruh data"""
+    first_byte = start // 8
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8, count=-(-stop // 8) - first_byte,
+                                       offset=first_byte))
+    return bits[start - first_byte * 8:stop - first_byte * 8]
+
+def lsb_values(data, start, stop, depth=1):
+    """Menghitung nilai depth bit untuk nilai kanal ke-start..stop dari payload data"""
+    # Nilai ke-i memuat bit payload ke-i*depth sampai (i+1)*depth-1, MSB dulu;
+    # nilai terakhir diisi nol jika bit payload habis
+    bit_stop = min(stop * depth, len(data) * 8)
+    bits = payload_bits(data, start * depth, bit_stop)
+    pad = (stop - start) * depth - bits.size
+    if pad:
+        bits = np.concatenate([bits, np.zeros(pad, dtype=np.uint8)])
+    if depth == 1:
+        return bits
+    return np.packbits(bits.reshape(-1, depth), axis=1).reshape(-1) >> (8 - depth)
+
+def strip_rows(img, memory_budget, values_factor=3):
+    """Jumlah baris per pita agar values_factor salinan pita muat di memory_budget"""
+    # Sampel 16 bit (I;16) dan 32 bit (I) memakan lebih dari satu byte per nilai
+    itemsize = {'I;16': 2, 'I': 4}.get(img.mode, 1)
+    row_bytes = img.size[0] * len(img.getbands()) * itemsize
+    return max(1, memory_budget // (row_bytes * values_factor))
+
+def embed_bytes_in_strips(img, data, memory_budget=STRIP_MEMORY_BUDGET, metrics='none',
+                          offset=0, depth=1):
+    """Menyisipkan bytes ke depth bit terbawah gambar PIL in-place per pita baris, mengembalikan squared error"""
+    # Hanya baris yang memuat payload (mulai nilai kanal ke-offset) yang disalin
+    # ke array numpy, lalu ditempel kembali; squared error None jika metrics='none'
+    width, height = img.size
+    row_values = width * len(img.getbands())
+    start, stop = offset, offset + values_needed(len(data), depth)
+    low_mask = (1 << depth) - 1
+
+    # Working set per pita: array pita dari crop, salinan nilai yang disisipi
+    # (hanya untuk metrik) dan nilai bit payload; tidak ada salinan cover penuh
+    band_rows = strip_rows(img, memory_budget)
+    squared_error = None if metrics == 'none' else 0
+    for top in range(start // row_values, -(-stop // row_values), band_rows):
+        bottom = min(top + band_rows, -(-stop // row_values))
+        band = np.array(img.crop((0, top, width, bottom)))
+        flat = band.reshape(-1)
+        base = top * row_values
+        lo, hi = max(start, base), min(stop, base + flat.size)
+        region = flat[lo - base:hi - base]
+
+        if squared_error is not None:
+            cover = region.copy()
+        # ~low_mask dalam dtype pita, sehingga sampel 16/32 bit ikut benar
+        keep_mask = np.array(~low_mask).astype(region.dtype)
+        region[:] = (region & keep_mask) | lsb_values(data, lo - start, hi - start, depth)
+
+        if squared_error is not None:
+            squared_error += calculate_squared_error(cover, region)
+        img.paste(Image.fromarray(band, img.mode), (0, top))
+    return squared_error
+
+def embed_bytes_at_positions(img, data, positions, memory_budget=STRIP_MEMORY_BUDGET, metrics='none',
+                             depth=1):
+    """Menyisipkan bytes ke depth bit terbawah nilai kanal di posisi terurut (scatter per pita baris)"""
+    # Posisi tersebar ke seluruh gambar, jadi semua pita disalin, tetap dalam
+    # batas memory_budget; hanya nilai di posisi yang diubah
+    width, height = img.size
+    row_values = width * len(img.getbands())
+    band_rows = strip_rows(img, memory_budget)
+    squared_error = None if metrics == 'none' else 0
+    for top in range(int(positions[0]) // row_values, int(positions[-1]) // row_values + 1, band_rows):
+        bottom = min(top + band_rows, height)
+        lo, hi = np.searchsorted(positions, (top * row_values, bottom * row_values))
+        if lo == hi:
+            continue
+        band = np.array(img.crop((0, top, width, bottom)))
+        flat = band.reshape(-1)
+        index = positions[lo:hi] - top * row_values
+        cover = flat[index]
+        keep_mask = np.array(~((1 << depth) - 1)).astype(cover.dtype)
+        flat[index] = (cover & keep_mask) | lsb_values(data, lo, hi, depth)
+        if squared_error is not None:
+            squared_error += calculate_squared_error(cover, flat[index])
+        img.paste(Image.fromarray(band, img.mode), (0, top))
+    return squared_error
+
+def embed_bytes_in_array(pixels, data, metrics='none', offset=0, depth=1, positions=None):
+    """Menyisipkan bytes ke depth bit terbawah array pixel in-place, mengembalikan squared error"""
+    # Hanya nilai kanal yang memuat payload yang disentuh (berurutan mulai
+    # offset, atau di positions untuk payload tersebar), tanpa salinan array
+    flat = pixels.reshape(-1)
+    if positions is None:
+        positions = slice(offset, offset + values_needed(len(data), depth))
+    cover = flat[positions]
+    if isinstance(positions, slice):
+        cover = cover.copy()
+    keep_mask = np.array(~((1 << depth) - 1)).astype(cover.dtype)
+    flat[positions] = (cover & keep_mask) | lsb_values(data, 0, cover.size, depth)
+    if metrics == 'none':
+        return None
+    return calculate_squared_error(cover, flat[positions])
+
+def find_delimiter(bits):
+    """Mencari posisi awal delimiter pertama di array bit, -1 jika tidak ada"""
+    # Delimiter berupa 15 bit '1' diikuti satu bit '0': cari bit '0' yang
+    # didahului tepat 15 bit '1' menggunakan jumlah kumulatif
+    zeros = np.flatnonzero(bits[15:] == 0) + 15
+    if zeros.size == 0:
+        return -1
+    ones = np.concatenate(([0], np.cumsum(bits, dtype=np.int64)))
+    ones_before = ones[zeros] - ones[zeros - 15]
+    hits = zeros[ones_before == 15]
+    if hits.size == 0:
+        return -1
+    return int(hits[0]) - 15
+
+def extract_bits(img_array, chunk_size=4096, max_chunk_size=1 << 20):
+    """Mengekstrak bit LSB secara bertahap sampai delimiter ditemukan"""
+    # Pesan hanya disisipkan pada 3 kanal pertama (RGB)
+    if img_array.ndim == 3:
+        pixels = img_array.reshape(-1, img_array.shape[2])[:, :3]
+    else:
+        pixels = img_array.reshape(-1, 1)
+    channels = pixels.shape[1]
+
+    chunks = []
+    tail = np.empty(0, dtype=np.uint8)
+    total = 0
+    pos = 0
+    while pos < pixels.shape[0]:
+        # Ambil potongan pixel berikutnya, ukurannya bertambah dua kali lipat
+        count = max(chunk_size // channels, 1)
+        chunk = pixels[pos:pos + count].reshape(-1) & 1
+        pos += count
+        chunks.append(chunk)
+
+        # Cari delimiter pada potongan baru, disambung 15 bit terakhir
+        # dari potongan sebelumnya agar delimiter yang terbelah tetap ditemukan
+        window = np.concatenate([tail, chunk])
+        found = find_delimiter(window)
+        if found >= 0:
+            end = total - tail.size + found
+            return np.concatenate(chunks)[:end]
+        total += chunk.size
+        tail = window[-15:]
+        chunk_size = min(chunk_size * 2, max_chunk_size)
+    return None
+
+def bits_to_text(bits):
+    """Mengkonversi array bit ke teks (8 bit per karakter)"""
+    full = bits.size - bits.size % 8
+    message = np.packbits(bits[:full]).tobytes().decode('latin-1')
+    if full < bits.size:
+        # Sisa bit yang kurang dari 8 diperlakukan sebagai satu karakter
+        message += chr(int(''.join(map(str, bits[full:])), 2))
+    return message
+
+# Instrumentasi: counter dan histogram per proses, diekspos di /metrics
+# dalam format teks Prometheus
+METRIC_DEFINITIONS = {
+    'stego_operations_total': ('counter', 'Jumlah operasi encode/decode per status', None),
+    'stego_payload_bytes_total': ('counter', 'Jumlah byte payload yang disisipkan/diekstrak', None),
+    'stego_operation_seconds': ('histogram', 'Durasi total operasi encode/decode',
+                                (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)),
+    'stego_stage_seconds': ('histogram', 'Durasi per tahap (load, convert, embed, save, metrics, ...)',
+                            (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)),
+    'stego_payload_cache_total': ('counter', 'Lookup cache payload hasil ekstraksi per hasil (hit/miss/evict)', None),
+    'stego_rejected_requests_total': ('counter', 'Request yang ditolak (503) karena slot in-flight atau antrean job penuh', None),
+    'stego_tracemalloc_peak_bytes': ('histogram', 'Puncak alokasi memori (hanya operasi yang disampel)',
+                                     (1e6, 5e6, 1e7, 5e7, 1e8, 2.5e8, 5e8, 1e9, 2.5e9)),
+}
+_counters = {}
+_histograms = {}
+_metrics_lock = threading.Lock()
+
+# Profiling tracemalloc bersifat opt-in: fraksi operasi yang disampel (0 = mati)
+TRACEMALLOC_SAMPLE_RATE = float(os.environ.get('STEGO_TRACEMALLOC_SAMPLE_RATE', '0'))
+_tracemalloc_lock = threading.Lock()
+
+def inc_counter(name, value=1, **labels):
+    """Menambah nilai counter dengan label tertentu"""
+    key = (name, tuple(sorted(labels.items())))
+    with _metrics_lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def observe(name, value, **labels):
+    """Mencatat satu observasi ke histogram dengan label tertentu"""
+    buckets = METRIC_DEFINITIONS[name][2]
+    key = (name, tuple(sorted(labels.items())))
+    with _metrics_lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                histogram['buckets'][i] += 1
+        histogram['sum'] += value
+        histogram['count'] += 1
+
+def take_metrics():
+    """Mengambil lalu mengosongkan counter dan histogram proses ini"""
+    # Dipakai worker process pool: metrik yang dicatat selama satu task
+    # dikirim bersama hasilnya lalu digabung di proses induk (merge_metrics)
+    with _metrics_lock:
+        snapshot = (dict(_counters), dict(_histograms))
+        _counters.clear()
+        _histograms.clear()
+    return snapshot
+
+def merge_metrics(snapshot):
+    """Menambahkan counter dan histogram dari worker ke metrik proses ini"""
+    counters, histograms = snapshot
+    with _metrics_lock:
+        for key, value in counters.items():
+            _counters[key] = _counters.get(key, 0) + value
+        for key, source in histograms.items():
+            histogram = _histograms.get(key)
+            if histogram is None:
+                _histograms[key] = source
+                continue
+            histogram['buckets'] = [a + b for a, b in zip(histogram['buckets'], source['buckets'])]
+            histogram['sum'] += source['sum']
+            histogram['count'] += source['count']
+
+def stage_clock(operation):
+    """Membuat pencatat waktu tahap; panggil dengan nama tahap yang baru saja selesai"""
+    last = [time.perf_counter()]
+    def mark(stage):
+        now = time.perf_counter()
+        observe('stego_stage_seconds', now - last[0], operation=operation, stage=stage)
+        last[0] = now
+    return mark
+
+@contextmanager
+def stage_timer(operation, stage):
+    """Context manager untuk mencatat durasi satu tahap"""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe('stego_stage_seconds', time.perf_counter() - start_time, operation=operation, stage=stage)
+
+def format_labels(labels, **extra):
+    """Memformat label Prometheus, contoh: {operation="encode",stage="load"}"""
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in items) + '}'
+
+def render_metrics():
+    """Menghasilkan seluruh metrik dalam format teks Prometheus"""
+    with _metrics_lock:
+        counters = dict(_counters)
+        histograms = {key: {'buckets': list(h['buckets']), 'sum': h['sum'], 'count': h['count']}
+                      for key, h in _histograms.items()}
+
+    lines = []
+    for name, (metric_type, help_text, buckets) in METRIC_DEFINITIONS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        if metric_type == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{format_labels(labels)} {value}')
+        else:
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(buckets, histogram['buckets']):
+                    lines.append(f'{name}_bucket{format_labels(labels, le=repr(float(bound)))} {count}')
+                lines.append(f'{name}_bucket{format_labels(labels, le="+Inf")} {histogram["count"]}')
+                lines.append(f'{name}_sum{format_labels(labels)} {histogram["sum"]}')
+                lines.append(f'{name}_count{format_labels(labels)} {histogram["count"]}')
+
+    # Ukuran cache payload saat ini
+    with _payload_cache_lock:
+        cache_entries, cache_bytes = len(_payload_cache), _payload_cache_bytes
+    lines.append('# HELP stego_payload_cache_entries Jumlah payload di cache ekstraksi')
+    lines.append('# TYPE stego_payload_cache_entries gauge')
+    lines.append(f'stego_payload_cache_entries {cache_entries}')
+    lines.append('# HELP stego_payload_cache_bytes Ukuran payload di cache ekstraksi dalam byte')
+    lines.append('# TYPE stego_payload_cache_bytes gauge')
+    lines.append(f'stego_payload_cache_bytes {cache_bytes}')
+
+    # Request berat yang sedang berjalan di proses ini
+    with _inflight_lock:
+        inflight = _inflight_count
+    lines.append('# HELP stego_inflight_requests Request encode/decode yang sedang berjalan')
+    lines.append('# TYPE stego_inflight_requests gauge')
+    lines.append(f'stego_inflight_requests {inflight}')
+    lines.append('# HELP stego_inflight_limit Batas request encode/decode bersamaan per proses')
+    lines.append('# TYPE stego_inflight_limit gauge')
+    lines.append(f'stego_inflight_limit {MAX_INFLIGHT}')
+
+    # Metrik proses (psutil dimuat saat /metrics pertama kali diminta)
+    import psutil
+    process = psutil.Process()
+    cpu_times = process.cpu_times()
+    lines.append('# HELP process_resident_memory_bytes Resident memory size in bytes')
+    lines.append('# TYPE process_resident_memory_bytes gauge')
+    lines.append(f'process_resident_memory_bytes {process.memory_info().rss}')
+    lines.append('# HELP process_cpu_seconds_total Total user and system CPU time in seconds')
+    lines.append('# TYPE process_cpu_seconds_total counter')
+    lines.append(f'process_cpu_seconds_total {cpu_times.user + cpu_times.system}')
+    return '\n'.join(lines) + '\n'
 
 def monitor_resources(func):
-    """Decorator untuk memonitor penggunaan sumber daya"""
+    """Decorator untuk mencatat durasi, status dan (opsional) memori sebuah operasi"""
+    operation = func.__name__.replace('_image', '')
+
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        # Mulai monitoring memori
-        tracemalloc.start()
-        # Catat waktu mulai
-        start_time = time.time()
-        # Catat penggunaan CPU awal
-        cpu_start = psutil.cpu_percent(interval=None)
-        
-        # Jalankan fungsi
-        result = func(*args, **kwargs)
-        
-        # Hitung penggunaan CPU
-        cpu_end = psutil.cpu_percent(interval=None)
-        # Hitung waktu eksekusi
-        execution_time = time.time() - start_time
-        # Hitung penggunaan memori
-        current, peak = tracemalloc.get_traced_memory()
-        tracemalloc.stop()
-        
-        # Tampilkan hasil monitoring
-        print("\nHasil Monitoring Sumber Daya:")
-        print(f"Waktu Eksekusi: {execution_time:.2f} detik")
-        print(f"Penggunaan CPU: {cpu_end:.1f}%")
-        print(f"Penggunaan RAM: {current / 10**6:.2f} MB")
-        print(f"Puncak Penggunaan RAM: {peak / 10**6:.2f} MB")
-        
-        return result
+        # tracemalloc bersifat global untuk satu proses, jadi hanya satu
+        # operasi yang disampel pada satu waktu
+        sampled = (TRACEMALLOC_SAMPLE_RATE > 0 and random.random() < TRACEMALLOC_SAMPLE_RATE
+                   and _tracemalloc_lock.acquire(blocking=False))
+        if sampled:
+            # tracemalloc hanya dimuat jika sampling aktif
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                _tracemalloc_lock.release()
+                sampled = False
+            else:
+                tracemalloc.start()
+        start_time = time.perf_counter()
+        status = 'error'
+        try:
+            result = func(*args, **kwargs)
+            status = 'success'
+            return result
+        finally:
+            observe('stego_operation_seconds', time.perf_counter() - start_time, operation=operation)
+            inc_counter('stego_operations_total', operation=operation, status=status)
+            if sampled:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                _tracemalloc_lock.release()
+                observe('stego_tracemalloc_peak_bytes', peak, operation=operation)
     return wrapper
 
+def prepare_payload(secret_text, key, filename, capacity, depth, compression, compression_level,
+                    channels, scatter=False):
+    """Mengenkripsi dan mengompresi rahasia, mengembalikan (header, payload, kompresi yang dipakai)"""
+    # Enkripsi pesan dan tambahkan key dengan separator khusus
+    attachment = is_attachment(secret_text)
+    encoded = build_payload(secret_text, key, filename)
+    if attachment:
+        print(f"Lampiran terenkripsi: {filename or DEFAULT_ATTACHMENT_NAME} ({len(encoded)} byte)")
+    else:
+        print(f"Pesan terenkripsi: {split_payload(encoded, False)[0]}")
+
+    # Susun payload (dikompresi jika diminta) dengan header berisi panjang,
+    # depth, kompresi yang dipakai, dan jenis payload
+    payload, compression = compress_payload(encoded, compression, compression_level)
+    if len(payload) > capacity:
+        raise ValueError("Pesan terlalu panjang untuk gambar ini")
+    flags = (FLAG_ATTACHMENT if attachment else 0) | (FLAG_SCATTER if scatter else 0)
+    header = build_header(len(payload), flags=flags, depth=depth, compression=compression,
+                          channels=channels)
+    return header, payload, compression
+
 @monitor_resources
-def encode_image(image_path, secret_text, key):
-    """Menyisipkan pesan terenkripsi ke dalam gambar menggunakan LSB"""
+def encode_image(image, secret_text, key, metrics='fast', progress=None, output='array',
+                 memory_budget=STRIP_MEMORY_BUDGET, depth=1, compression='none',
+                 compression_level=DEFAULT_COMPRESSION_LEVEL, filename=None, scatter=False):
+    """Menyisipkan pesan terenkripsi ke dalam gambar menggunakan LSB, mengembalikan (gambar stego, metrik)"""
+    # output='array' mengembalikan array numpy, output='image' mengembalikan
+    # PIL Image tanpa salinan penuh tambahan (disarankan untuk gambar besar).
+    # depth menentukan jumlah bit LSB per kanal (1-4) untuk payload,
+    # compression ('none', 'zlib', 'lzma') dijalankan setelah enkripsi.
+    # secret_text berupa str (teks UTF-8) atau bytes/memoryview (lampiran
+    # biner dengan nama filename). scatter=True menyebar payload ke posisi
+    # acak yang ditentukan kunci, bukan nilai kanal berurutan setelah header
     try:
+        if metrics not in METRICS_MODES:
+            raise ValueError(f"Mode metrik tidak valid: {metrics}")
+        if depth not in LSB_DEPTHS:
+            raise ValueError(f"Jumlah bit LSB tidak valid: {depth}")
+        if compression not in COMPRESSION_MODES:
+            raise ValueError(f"Mode kompresi tidak valid: {compression}")
+        if compression_level not in COMPRESSION_LEVELS:
+            raise ValueError(f"Level kompresi tidak valid: {compression_level}")
+
         # Buka gambar
-        img = Image.open(image_path)
-        
-        # Konversi ke RGB jika diperlukan
-        if img.mode != 'RGB':
-            print(f"Mengkonversi gambar dari mode {img.mode} ke RGB...")
-            img = img.convert('RGB')
-        
-        # Konversi ke PNG untuk menghindari kompresi lossy
-        if image_path.lower().endswith('.jpg') or image_path.lower().endswith('.jpeg'):
-            image_path = image_path.rsplit('.', 1)[0] + '.png'
-            img.save(image_path, 'PNG')
-            print("Gambar dikonversi ke PNG untuk menghindari kehilangan data")
-        
-        # Konversi ke array numpy setelah memastikan mode RGB
-        img_array = np.array(img)
-        
-        # Verifikasi shape array
-        if len(img_array.shape) != 3 or img_array.shape[2] != 3:
-            raise ValueError(f"Format gambar tidak valid. Shape array: {img_array.shape}")
+        clock = stage_clock('encode')
+        report_progress(progress, stage='load')
+        img = open_image(image)
 
-        # Enkripsi pesan
-        encrypted_text = encrypt_custom(secret_text, key)
-        print(f"Pesan terenkripsi: {encrypted_text}")
-        
-        # Tambahkan key ke encrypted text dengan separator khusus
-        encoded_text = f"{encrypted_text}|{key}|"
-        
-        # Konversi pesan ke binary
-        binary_message = text_to_binary(encoded_text) + '1111111111111110'  # Delimiter
-        
-        if len(binary_message) > img_array.size:
+        # Cek kapasitas dari header gambar sebelum decode pixel dan enkripsi.
+        # Payload terkompresi hanya bisa dicek setelah kompresi di bawah
+        mode = embedding_mode(img)
+        channels = Image.getmodebands(mode)
+        capacity = embedding_capacity(*img.size, channels)[capacity_mode(depth)]
+        if compression == 'none' and payload_size(secret_text, key, filename) > capacity:
             raise ValueError("Pesan terlalu panjang untuk gambar ini")
 
-        # Sisipkan pesan ke dalam pixel gambar
-        idx = 0
-        for i in range(img_array.shape[0]):
-            for j in range(img_array.shape[1]):
-                for k in range(3):  # RGB channels
-                    if idx < len(binary_message):
-                        img_array[i, j, k] = (img_array[i, j, k] & 254) | int(binary_message[idx])
-                        idx += 1
-
-        # Simpan gambar hasil
-        result_img = Image.fromarray(img_array)
+        header, payload, compression = prepare_payload(secret_text, key, filename, capacity, depth,
+                                                       compression, compression_level, channels,
+                                                       scatter)
+        clock('compress')
+
+        img.load()
+        clock('load')
         
-        # Perbaikan path output
-        base_name = os.path.basename(image_path)
-        output_path = "encoded_" + base_name
-        output_dir = os.path.dirname(image_path)
-        if output_dir:
-            output_path = os.path.join(output_dir, output_path)
-            
-        # Pastikan output selalu dalam format PNG
-        if not output_path.lower().endswith('.png'):
-            output_path = output_path.rsplit('.', 1)[0] + '.png'
-            
-        result_img.save(output_path, 'PNG')
+        # Sisipkan langsung pada mode asli (L, LA, RGB, RGBA, 16 bit); hanya
+        # mode lain (palet, 1 bit, CMYK, ...) yang dikonversi
+        if img.mode != mode:
+            print(f"Mengkonversi gambar dari mode {img.mode} ke {mode}...")
+            img = img.convert(mode)
+        elif img is image:
+            # Jangan ubah PIL Image milik pemanggil
+            img = img.copy()
+        clock('convert')
+
+        total_values = img.size[0] * img.size[1] * channels
+        touched = HEADER_BITS + values_needed(len(payload), depth)
         
-        # Hitung dan tampilkan MSE dan PSNR
-        mse, psnr = calculate_mse_psnr(image_path, output_path)
-        print(f"\nHasil analisis kualitas gambar:")
-        print(f"MSE: {mse:.6f}")
-        print(f"PSNR: {psnr:.2f} dB")
+        if touched > total_values:
+            raise ValueError("Pesan terlalu panjang untuk gambar ini")
+
+        # Sisipkan header (1 bit per kanal) lalu payload (depth bit per kanal)
+        # per pita baris, hanya baris yang memuat payload yang disentuh
+        report_progress(progress, stage='embed', pixels_total=img.size[0] * img.size[1])
+        squared_error = embed_bytes_in_strips(img, header, memory_budget, metrics)
+        if scatter:
+            positions = scatter_positions(key, values_needed(len(payload), depth), total_values)
+            payload_error = embed_bytes_at_positions(img, payload, positions, memory_budget, metrics,
+                                                     depth=depth)
+        else:
+            payload_error = embed_bytes_in_strips(img, payload, memory_budget, metrics,
+                                                  offset=HEADER_BITS, depth=depth)
+        if squared_error is not None:
+            squared_error += payload_error
+        clock('embed')
+        inc_counter('stego_payload_bytes_total', HEADER_SIZE + len(payload), operation='encode')
+        report_progress(progress, stage='metrics',
+                        pixels_processed=-(-touched // channels),
+                        bytes_embedded=HEADER_SIZE + len(payload))
+
+        # MSE dan PSNR dihitung dari pita yang disisipi; baris lain identik
+        quality = None
+        if squared_error is not None:
+            mse, psnr = quality_from_squared_error(squared_error, total_values, NATIVE_MODES[mode])
+            quality = {'mse': mse, 'psnr': psnr, 'depth': depth, 'compression': compression,
+                       'payload_bytes': HEADER_SIZE + len(payload), 'mode': mode, 'scatter': scatter}
+            clock('metrics')
+            print(f"\nHasil analisis kualitas gambar:")
+            print(f"MSE: {mse:.6f}")
+            print(f"PSNR: {psnr:.2f} dB")
         
-        return output_path
+        # Hasil disimpan oleh pemanggil dengan encoder lossless (image_to_bytes)
+        if output == 'image':
+            return img, quality
+        return np.array(img), quality
         
     except Exception as e:
         # Tambahkan informasi debug
         print(f"Debug info - Image mode: {img.mode if 'img' in locals() else 'unknown'}")
-        print(f"Debug info - Array shape: {img_array.shape if 'img_array' in locals() else 'unknown'}")
+        print(f"Debug info - Image size: {img.size if 'img' in locals() else 'unknown'}")
         raise Exception(f"Terjadi kesalahan saat encoding: {str(e)}")
 
+def array_mode(pixels):
+    """Mode Pillow untuk array pixel yang bisa disisipi langsung (L, LA, RGB, RGBA, I;16, I)"""
+    if pixels.dtype == np.uint8:
+        if pixels.ndim == 2:
+            return 'L'
+        if pixels.ndim == 3 and pixels.shape[2] in (2, 3, 4):
+            return {2: 'LA', 3: 'RGB', 4: 'RGBA'}[pixels.shape[2]]
+    if pixels.ndim == 2 and pixels.dtype in (np.uint16, np.int32):
+        return 'I;16' if pixels.dtype == np.uint16 else 'I'
+    raise ValueError(f"Array pixel tidak didukung: dtype {pixels.dtype}, shape {pixels.shape}")
+
 @monitor_resources
-def decode_image(image_path, input_key):
-    """Mengekstrak dan mendekripsi pesan dari gambar"""
+def encode_array(pixels, secret_text, key, metrics='fast', depth=1, compression='none',
+                 compression_level=DEFAULT_COMPRESSION_LEVEL, filename=None, scatter=False):
+    """Menyisipkan pesan terenkripsi langsung ke array pixel (in-place), mengembalikan metrik"""
+    # Dipakai worker shared memory: array adalah view segmen bersama, jadi
+    # tidak ada salinan gambar; hasilnya identik dengan encode_image
     try:
-        # Buka gambar
-        img = Image.open(image_path)
-        img_array = np.array(img)
-
-        # Ekstrak binary message
-        binary_message = ""
-        for i in range(img_array.shape[0]):
-            for j in range(img_array.shape[1]):
-                for k in range(3):
-                    binary_message += str(img_array[i, j, k] & 1)
-                    if binary_message.endswith('1111111111111110'):
-                        # Temukan delimiter dan hentikan ekstraksi
-                        binary_message = binary_message[:-16]
-                        # Konversi binary ke teks
-                        message = ""
-                        for idx in range(0, len(binary_message), 8):
-                            byte = binary_message[idx:idx+8]
-                            message += chr(int(byte, 2))
-                        
-                        # Pisahkan pesan dan key
-                        try:
-                            encrypted_text, stored_key, _ = message.split('|')
-                            stored_key = int(stored_key)
-                            
-                            # Dekripsi pesan dengan kunci yang dimasukkan
-                            decrypted_message = decrypt_custom(encrypted_text, input_key)
-                            
-                            # Langsung return hasil dekripsi tanpa validasi kunci
-                            return {
-                                'status': 'success',
-                                'message': decrypted_message,
-                                'encrypted': encrypted_text
-                            }
-                            
-                        except Exception as e:
-                            print(f"Decoding error detail: {str(e)}")
-                            return {
-                                'status': 'error',
-                                'message': 'Format pesan tidak valid!'
-                            }
+        if metrics not in METRICS_MODES:
+            raise ValueError(f"Mode metrik tidak valid: {metrics}")
+        if depth not in LSB_DEPTHS:
+            raise ValueError(f"Jumlah bit LSB tidak valid: {depth}")
+        if compression not in COMPRESSION_MODES:
+            raise ValueError(f"Mode kompresi tidak valid: {compression}")
+        if not pixels.flags.c_contiguous or not pixels.flags.writeable:
+            raise ValueError("Array pixel harus C-contiguous dan bisa ditulis")
+
+        clock = stage_clock('encode_array')
+        mode = array_mode(pixels)
+        width, height, channels = pixel_shape(pixels)
+        capacity = embedding_capacity(width, height, channels)[capacity_mode(depth)]
+        header, payload, compression = prepare_payload(secret_text, key, filename, capacity, depth,
+                                                       compression, compression_level, channels,
+                                                       scatter)
+        clock('compress')
+
+        positions = None
+        if scatter:
+            positions = scatter_positions(key, values_needed(len(payload), depth), pixels.size)
+        squared_error = embed_bytes_in_array(pixels, header, metrics)
+        payload_error = embed_bytes_in_array(pixels, payload, metrics, offset=HEADER_BITS, depth=depth,
+                                             positions=positions)
+        clock('embed')
+        inc_counter('stego_payload_bytes_total', HEADER_SIZE + len(payload), operation='encode')
+
+        if squared_error is None:
+            return None
+        mse, psnr = quality_from_squared_error(squared_error + payload_error, pixels.size,
+                                               NATIVE_MODES[mode])
+        clock('metrics')
+        return {'mse': mse, 'psnr': psnr, 'depth': depth, 'compression': compression,
+                'payload_bytes': HEADER_SIZE + len(payload), 'mode': mode, 'scatter': scatter}
+
+    except Exception as e:
+        raise Exception(f"Terjadi kesalahan saat encoding: {str(e)}")
+
+# Cache payload hasil ekstraksi, dikunci dengan hash isi file gambar. Hanya
+# dekripsi yang bergantung pada kunci, jadi decode ulang gambar yang sama
+# (misalnya mencoba beberapa kunci) tidak perlu membaca pixel lagi.
+# Batas ukuran dalam byte payload (0 = mati), dibuang dengan urutan LRU
+PAYLOAD_CACHE_BYTES = int(os.environ.get('STEGO_PAYLOAD_CACHE_BYTES', 64 * 1024 * 1024))
+PAYLOAD_CACHE_ENTRY_OVERHEAD = 256  # Perkiraan byte per entri di luar payload
+_payload_cache = OrderedDict()
+_payload_cache_bytes = 0
+_payload_cache_lock = threading.Lock()
+_MISSING = object()
+SCATTER_MARKER = {'payload': b'', 'scatter': True}
+
+def image_digest(source):
+    """Hash isi file gambar untuk kunci cache, None jika sumber bukan bytes/BytesIO"""
+    # Array numpy, PIL Image dan path tidak di-cache: isi file aslinya tidak tersedia
+    if isinstance(source, io.BytesIO):
+        source = source.getbuffer()
+    elif not isinstance(source, (bytes, bytearray, memoryview)):
         return None
+    return hashlib.sha256(source).hexdigest()
+
+def cache_entry_size(entry):
+    """Perkiraan ukuran satu entri cache dalam byte"""
+    return PAYLOAD_CACHE_ENTRY_OVERHEAD + (len(entry['payload']) if entry is not None else 0)
+
+def payload_cache_get(digest):
+    """Mengambil payload dari cache (dan menandainya baru dipakai), _MISSING jika tidak ada"""
+    if digest is None or PAYLOAD_CACHE_BYTES <= 0:
+        return _MISSING
+    with _payload_cache_lock:
+        entry = _payload_cache.get(digest, _MISSING)
+        if entry is not _MISSING:
+            _payload_cache.move_to_end(digest)
+    inc_counter('stego_payload_cache_total', result='miss' if entry is _MISSING else 'hit')
+    return entry
+
+def payload_cache_put(digest, entry):
+    """Menyimpan payload ke cache lalu membuang entri terlama sampai muat di batas ukuran"""
+    global _payload_cache_bytes
+    size = cache_entry_size(entry)
+    if digest is None or size > PAYLOAD_CACHE_BYTES:
+        return
+    evicted = 0
+    with _payload_cache_lock:
+        if digest in _payload_cache:
+            _payload_cache_bytes -= cache_entry_size(_payload_cache.pop(digest))
+        _payload_cache[digest] = entry
+        _payload_cache_bytes += size
+        while _payload_cache_bytes > PAYLOAD_CACHE_BYTES:
+            _, old = _payload_cache.popitem(last=False)
+            _payload_cache_bytes -= cache_entry_size(old)
+            evicted += 1
+    if evicted:
+        inc_counter('stego_payload_cache_total', evicted, result='evict')
+
+def clear_payload_cache():
+    """Mengosongkan cache payload"""
+    global _payload_cache_bytes
+    with _payload_cache_lock:
+        _payload_cache.clear()
+        _payload_cache_bytes = 0
+
+def extract_payload(img, clock, progress=None, key=None):
+    """Mengekstrak payload mentah (belum didekripsi) dari gambar PIL atau array numpy, None jika tidak ada pesan"""
+    # key hanya dibutuhkan untuk payload tersebar (posisinya diturunkan dari kunci);
+    # tanpa key, payload tersebar dikembalikan sebagai SCATTER_MARKER
+    width, height, channels = pixel_shape(img)
+    report_progress(progress, stage='extract', pixels_total=width * height)
+
+    # Baca header untuk mengetahui panjang payload secara langsung
+    header = read_header(img)
+    if header is None:
+        # Format lama: ekstrak binary message sampai delimiter ditemukan
+        binary_message = extract_bits(np.asarray(img))
+        if binary_message is None:
+            return None
+        payload = bits_to_text(binary_message).encode('latin-1')
+        clock('extract')
+        inc_counter('stego_payload_bytes_total', binary_message.size // 8, operation='decode')
+        report_progress(progress, stage='decrypt',
+                        pixels_processed=-(-(binary_message.size + 16) // min(channels, 3)),
+                        bytes_embedded=binary_message.size // 8)
+        return {'payload': payload, 'attachment': False, 'encoding': 'latin-1', 'error': None,
+                'scatter': False}
+
+    if header['cipher'] not in SUPPORTED_CIPHERS:
+        # Cipher lain tidak boleh didekripsi dengan cipher ini (hasilnya sampah);
+        # errornya tidak bergantung kunci, jadi di-cache seperti payload biasa
+        return {'payload': b'', 'attachment': False, 'encoding': 'utf-8', 'scatter': False,
+                'error': f"Id cipher {header['cipher']} pada header tidak didukung"}
+
+    positions = None
+    if header['scatter']:
+        if key is None:
+            # Posisi payload diturunkan dari kunci; tanpa kunci (sweep) hanya penanda
+            return SCATTER_MARKER
+        positions = scatter_positions(key, values_needed(header['length'], header['depth']),
+                                      width * height * channels)
+    payload = read_lsb_bytes(img, HEADER_BITS, header['length'], header['depth'], positions=positions)
+    clock('extract')
+    inc_counter('stego_payload_bytes_total', HEADER_SIZE + len(payload), operation='decode')
+    report_progress(progress, stage='decrypt',
+                    pixels_processed=-(-(HEADER_BITS + values_needed(len(payload), header['depth'])) // channels),
+                    bytes_embedded=HEADER_SIZE + len(payload))
+    try:
+        payload = decompress_payload(payload, header['compression'])
+    except Exception as e:
+        # Payload rusak tetap di-cache agar decode ulang langsung gagal tanpa baca pixel
+        return {'payload': b'', 'attachment': False, 'encoding': 'utf-8', 'error': str(e),
+                'scatter': header['scatter']}
+    return {'payload': payload, 'attachment': header['attachment'], 'encoding': 'utf-8', 'error': None,
+            'scatter': header['scatter']}
+
+def decrypt_payload(entry, input_key):
+    """Memisahkan dan mendekripsi payload hasil ekstraksi dengan kunci yang dimasukkan"""
+    if entry['error'] is not None:
+        return {
+            'status': 'error',
+            'message': entry['error']
+        }
+    try:
+        if entry['attachment']:
+            # Lampiran biner: dekripsi nama + isi file sekaligus
+            body, stored_key, name_length = split_payload(entry['payload'], True)
+            body = decrypt_custom(body, input_key)
+            return {
+                'status': 'success',
+                'message': '',
+                'encrypted': '',
+                'filename': body[:name_length].decode('utf-8', 'replace'),
+                'attachment': body[name_length:],
+                'stored_key': stored_key
+            }
+
+        # Pisahkan pesan dan key
+        message = entry['payload'].decode(entry['encoding'])
+        encrypted_text, stored_key, _ = message.rsplit('|', 2)
+        stored_key = int(stored_key)
+
+        # Dekripsi pesan dengan kunci yang dimasukkan
+        decrypted_message = decrypt_custom(encrypted_text, input_key)
+
+        # Langsung return hasil dekripsi tanpa validasi kunci
+        return {
+            'status': 'success',
+            'message': decrypted_message,
+            'encrypted': encrypted_text,
+            'stored_key': stored_key
+        }
+
+    except Exception as e:
+        print(f"Decoding error detail: {str(e)}")
+        return {
+            'status': 'error',
+            'message': 'Format pesan tidak valid!'
+        }
+
+def scatter_cache_key(digest, key):
+    """Kunci cache payload tersebar: posisinya bergantung pada kunci, jadi per (gambar, kunci)"""
+    return None if digest is None else f'{digest}:{key}'
+
+def load_payload(image, clock, progress=None, use_cache=True, key=None):
+    """Mengambil payload hasil ekstraksi dari cache, atau membaca pixel gambar jika belum ada"""
+    # Untuk sumber bytes/BytesIO, payload hasil ekstraksi di-cache per isi file
+    # sehingga decode ulang hanya menjalankan dekripsi. Gambar dengan payload
+    # tersebar hanya menyimpan penanda di kunci hash, payload-nya per kunci
+    report_progress(progress, stage='load')
+    digest = image_digest(image) if use_cache else None
+    entry = payload_cache_get(digest)
+    if entry is SCATTER_MARKER and key is not None:
+        entry = payload_cache_get(scatter_cache_key(digest, key))
+    clock('cache')
+
+    if entry is _MISSING:
+        # Buka gambar
+        img = open_image(image)
+        img.load()
+        clock('load')
+        entry = extract_payload(img, clock, progress, key)
+        if entry is SCATTER_MARKER:
+            payload_cache_put(digest, SCATTER_MARKER)
+        elif entry is not None and entry['scatter']:
+            payload_cache_put(digest, SCATTER_MARKER)
+            payload_cache_put(scatter_cache_key(digest, key), entry)
+        else:
+            payload_cache_put(digest, entry)
+    else:
+        report_progress(progress, stage='decrypt', cache='hit')
+    return entry
+
+@monitor_resources
+def decode_image(image, input_key, progress=None, use_cache=True):
+    """Mengekstrak dan mendekripsi pesan dari gambar"""
+    try:
+        clock = stage_clock('decode')
+        entry = load_payload(image, clock, progress, use_cache, input_key)
+        if entry is None:
+            return None
+        result = decrypt_payload(entry, input_key)
+        clock('decrypt')
+        return result
         
     except Exception as e:
         raise Exception(f"Terjadi kesalahan saat decoding: {str(e)}")
 
+# Sweep semua kunci: cipher adalah pergeseran mod 62, jadi hanya ada 62 kandidat
+# plaintext. Semua kandidat dihitung sekaligus dengan lookup tabel 62 x 256
+SWEEP_KEYS = 62
+SWEEP_SAMPLE_BYTES = 64 * 1024  # Panjang awal ciphertext yang dipakai untuk skor
+
+# Frekuensi huruf (%) rata-rata teks bahasa Indonesia dan Inggris
+LETTER_FREQUENCIES = {
+    'a': 13.6, 'b': 2.1, 'c': 1.8, 'd': 4.1, 'e': 10.5, 'f': 1.2, 'g': 2.8, 'h': 4.3,
+    'i': 7.5, 'j': 0.5, 'k': 3.0, 'l': 3.8, 'm': 3.2, 'n': 7.9, 'o': 4.9, 'p': 2.4,
+    'q': 0.05, 'r': 5.2, 's': 5.2, 't': 7.0, 'u': 3.9, 'v': 0.6, 'w': 1.5, 'x': 0.1,
+    'y': 2.1, 'z': 0.1
+}
+UPPERCASE_WEIGHT = 0.1  # Huruf besar ~10x lebih jarang dari huruf kecil
+DIGIT_FREQUENCY = 0.3
+
+# Kata umum (dengan spasi di kedua sisi) untuk bonus skor per kandidat
+SWEEP_WORDS = (b' yang ', b' dan ', b' di ', b' ini ', b' itu ', b' dengan ', b' untuk ', b' tidak ',
+               b' ada ', b' the ', b' and ', b' of ', b' to ', b' is ', b' in ', b' for ', b' flag ')
+WORD_HIT_WEIGHT = 5.0  # Bobot per kata ditemukan per 100 karakter alfanumerik
+
+@functools.lru_cache(maxsize=None)
+def sweep_tables():
+    """Tabel dekripsi 62 x 256: baris ke-k adalah decrypt_custom dengan kunci k"""
+    return np.stack([np.frombuffer(cipher_table(-key % 62), dtype=np.uint8)
+                     for key in range(SWEEP_KEYS)])
+
+@functools.lru_cache(maxsize=None)
+def letter_scores():
+    """Log-probabilitas per byte untuk karakter alfanumerik (0 untuk byte lain)"""
+    weights = np.zeros(256)
+    for char, frequency in LETTER_FREQUENCIES.items():
+        weights[ord(char)] = frequency
+        weights[ord(char.upper())] = frequency * UPPERCASE_WEIGHT
+    for char in '0123456789':
+        weights[ord(char)] = DIGIT_FREQUENCY
+    alnum = weights > 0
+    scores = np.zeros(256)
+    scores[alnum] = np.log(weights[alnum] / weights[alnum].sum())
+    return scores, alnum
+
+def rank_candidates(ciphertext):
+    """Menghitung skor 62 kandidat dekripsi dari ciphertext, mengembalikan (skor, kata ditemukan)"""
+    # Cipher hanya menukar karakter alfanumerik dengan alfanumerik, jadi skor
+    # dihitung dari rata-rata log-probabilitas huruf pada posisi alfanumerik
+    sample = np.frombuffer(ciphertext[:SWEEP_SAMPLE_BYTES], dtype=np.uint8)
+    candidates = sweep_tables()[:, sample]
+    scores_table, alnum = letter_scores()
+    alnum_count = max(int(alnum[sample].sum()), 1)
+    scores = scores_table[candidates].sum(axis=1) / alnum_count
+    padded = (b' ' + row.tobytes().lower() + b' ' for row in candidates)
+    word_hits = np.array([sum(text.count(word) for word in SWEEP_WORDS) for text in padded])
+    scores += WORD_HIT_WEIGHT * word_hits * 100 / alnum_count
+    return scores, word_hits
+
+@monitor_resources
+def sweep_decode(image, top=SWEEP_KEYS, progress=None, use_cache=True):
+    """Mengekstrak payload sekali lalu mendekripsi dengan semua 62 kunci, diurutkan menurut skor"""
+    try:
+        clock = stage_clock('sweep')
+        entry = load_payload(image, clock, progress, use_cache)
+        if entry is None:
+            return None
+        if entry is SCATTER_MARKER:
+            # Posisi payload tersebar bergantung pada kunci, jadi tidak bisa di-sweep
+            return {
+                'status': 'error',
+                'message': 'Payload tersebar hanya bisa dibaca dengan kunci, tidak bisa di-sweep'
+            }
+        if entry['error'] is not None:
+            return {
+                'status': 'error',
+                'message': entry['error']
+            }
+
+        # Ciphertext dalam bytes: teks dienkode seperti pada apply_cipher
+        try:
+            if entry['attachment']:
+                ciphertext, stored_key, name_length = split_payload(entry['payload'], True)
+            else:
+                message = entry['payload'].decode(entry['encoding'])
+                encrypted_text, stored_key, _ = message.rsplit('|', 2)
+                stored_key = int(stored_key)
+                ciphertext = encrypted_text.encode('utf-8', 'surrogatepass')
+        except (ValueError, struct.error) as e:
+            # Gambar tanpa pesan: sama seperti decrypt_payload, bukan error server
+            print(f"Sweep error detail: {str(e)}")
+            return {
+                'status': 'error',
+                'message': 'Format pesan tidak valid!'
+            }
+
+        report_progress(progress, stage='sweep', candidates=SWEEP_KEYS)
+        scores, word_hits = rank_candidates(ciphertext)
+        clock('score')
+
+        # Hanya kandidat teratas yang didekripsi penuh
+        ranking = np.argsort(-scores, kind='stable')[:top]
+        candidates = []
+        for key in ranking:
+            plaintext = ciphertext.translate(cipher_table(-int(key) % 62))
+            candidate = {
+                'key': int(key),
+                'score': float(scores[key]),
+                'word_hits': int(word_hits[key]),
+                'matches_stored_key': int(key) == stored_key % 62
+            }
+            if entry['attachment']:
+                candidate['filename'] = plaintext[:name_length].decode('utf-8', 'replace')
+                candidate['attachment'] = plaintext[name_length:]
+            else:
+                candidate['message'] = plaintext.decode('utf-8', 'surrogatepass')
+            candidates.append(candidate)
+        clock('decrypt')
+
+        return {
+            'status': 'success',
+            'stored_key': stored_key,
+            'attachment': entry['attachment'],
+            'candidates': candidates
+        }
+
+    except Exception as e:
+        raise Exception(f"Terjadi kesalahan saat sweep decoding: {str(e)}")
+
+# Steganalisis LSB untuk screening massal: chi-square attack (Westfeld &
+# Pfitzmann) pada prefix berurutan untuk penyisipan sekuensial, RS analysis
+# (Fridrich) untuk perkiraan rasio penyisipan, dan cek cepat header/delimiter
+# milik aplikasi ini. Semua dihitung dengan histogram dan operasi blok numpy
+CHI_SQUARE_SEGMENTS = 32  # Jumlah prefix (kelipatan 1/32 gambar) yang diuji
+CHI_SQUARE_MIN_EXPECTED = 5  # Pasangan nilai dengan frekuensi harapan lebih kecil diabaikan
+CHI_SQUARE_THRESHOLD = 0.95  # p-value di atas ini dianggap tersisipi
+RS_GROUP_SIZE = 4  # Mask M = [0, 1, 1, 0]: dua nilai tengah grup yang dibalik
+RS_MAX_GROUPS = 1 << 16  # Grup RS maksimum per gambar, baris diambil berselang jika lebih
+RS_THRESHOLD = 0.1  # Rasio RS di atas ini dianggap tersisipi
+LEGACY_SCAN_BITS = 8 * 1024 * 8  # Bit LSB awal yang dipindai untuk delimiter format lama
+LEGACY_TAIL = re.compile(rb'\|-?\d+\|$')  # Payload format lama diakhiri |key|
+
+def chi_square_pvalue(chi_square, dof):
+    """Peluang ekor atas distribusi chi-square (aproksimasi Wilson-Hilferty)"""
+    if dof <= 0:
+        return 0.0
+    z = ((chi_square / dof) ** (1 / 3) - (1 - 2 / (9 * dof))) / math.sqrt(2 / (9 * dof))
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+def chi_square_attack(values, segments=CHI_SQUARE_SEGMENTS):
+    """Chi-square attack pada prefix 1/segments, 2/segments, ... dari nilai kanal berurutan"""
+    # Penyisipan LSB menyamakan frekuensi pasangan nilai (2k, 2k+1); prefix yang
+    # seluruhnya tersisipi memberi p-value mendekati 1
+    length = values.size // segments
+    if length == 0:
+        return {'p_values': [], 'p_value': 0.0, 'embedded_fraction': 0.0}
+    histograms = np.stack([np.bincount(values[i * length:(i + 1) * length], minlength=256)
+                           for i in range(segments)])
+    cumulative = np.cumsum(histograms, axis=0)
+    observed = cumulative[:, 0::2]
+    expected = (observed + cumulative[:, 1::2]) / 2
+    valid = expected >= CHI_SQUARE_MIN_EXPECTED
+    chi_square = np.where(valid, (observed - expected) ** 2 / np.where(valid, expected, 1), 0).sum(axis=1)
+    dof = valid.sum(axis=1) - 1
+    p_values = [chi_square_pvalue(float(c), int(d)) for c, d in zip(chi_square, dof)]
+    # Penyisipan sekuensial: p-value tinggi sampai prefix melewati akhir pesan,
+    # lalu turun cepat. Prefix pertama bisa tidak stabil pada area datar, jadi
+    # yang dipakai adalah prefix terakhir yang masih di atas ambang
+    embedded = [i for i, p in enumerate(p_values) if p >= CHI_SQUARE_THRESHOLD]
+    return {
+        'p_values': [round(p, 6) for p in p_values],
+        'p_value': max(p_values),
+        'embedded_fraction': (embedded[-1] + 1) / segments if embedded else 0.0
+    }
+
+def rs_smoothness(x0, x1, x2, x3):
+    """Fungsi diskriminasi RS: jumlah selisih absolut nilai bertetangga per grup"""
+    return np.abs(x1 - x0) + np.abs(x2 - x1) + np.abs(x3 - x2)
+
+def rs_counts(columns):
+    """Proporsi grup regular/singular untuk mask M (flip 0<->1) dan -M (flip -1<->0)"""
+    # Grup disimpan per kolom (4 x jumlah grup) agar setiap operasi berupa
+    # vektor panjang, bukan reduksi sepanjang sumbu berukuran 4
+    x0, x1, x2, x3 = columns
+    base = rs_smoothness(x0, x1, x2, x3)
+    positive = rs_smoothness(x0, x1 ^ 1, x2 ^ 1, x3)
+    negative = rs_smoothness(x0, ((x1 + 1) ^ 1) - 1, ((x2 + 1) ^ 1) - 1, x3)
+    count = base.size
+    return (np.count_nonzero(positive > base) / count, np.count_nonzero(positive < base) / count,
+            np.count_nonzero(negative > base) / count, np.count_nonzero(negative < base) / count)
+
+def rs_groups(pixels):
+    """Grup 4 nilai horizontal per kanal sebagai kolom, baris diambil berselang agar <= RS_MAX_GROUPS"""
+    planes = np.moveaxis(pixels, -1, 0) if pixels.ndim == 3 else pixels[None]
+    width = planes.shape[2] - planes.shape[2] % RS_GROUP_SIZE
+    rows_total = planes.shape[0] * planes.shape[1]
+    step = max(1, -(-rows_total * (width // RS_GROUP_SIZE) // RS_MAX_GROUPS))
+    dtype = np.int16 if pixels.dtype == np.uint8 else np.int32
+    return np.ascontiguousarray(planes[:, ::step, :width].reshape(-1, RS_GROUP_SIZE).T, dtype=dtype)
+
+def rs_analysis(pixels):
+    """RS analysis: perkiraan rasio nilai kanal yang LSB-nya berisi pesan (0-1)"""
+    columns = rs_groups(pixels)
+    if columns.size == 0:
+        return {'rate': 0.0}
+    r_m, s_m, r_n, s_n = rs_counts(columns)
+    r_m1, s_m1, r_n1, s_n1 = rs_counts(columns ^ 1)
+    # Persamaan kuadrat Fridrich dengan gambar yang seluruh LSB-nya dibalik
+    d0, d1 = r_m - s_m, r_m1 - s_m1
+    dn0, dn1 = r_n - s_n, r_n1 - s_n1
+    a, b, c = 2 * (d1 + d0), dn0 - dn1 - d1 - 3 * d0, d0 - dn0
+    if abs(a) < 1e-12:
+        x = -c / b if b else 0.0
+    else:
+        root = math.sqrt(max(b * b - 4 * a * c, 0.0))
+        x = min((-b + root) / (2 * a), (-b - root) / (2 * a), key=abs)
+    rate = x / (x - 0.5) if x != 0.5 else 1.0
+    return {
+        'rate': max(0.0, min(rate, 1.0)),
+        'regular_m': float(r_m), 'singular_m': float(s_m),
+        'regular_neg_m': float(r_n), 'singular_neg_m': float(s_n)
+    }
+
+def stego_signature(pixels):
+    """Cek cepat header (atau delimiter format lama) milik aplikasi ini di awal LSB"""
+    width, height, channels = pixel_shape(pixels)
+    total_values = width * height * channels
+    if total_values >= HEADER_BITS:
+        header = parse_header(read_lsb_bytes(pixels, 0, HEADER_SIZE))
+        if (header is not None and header['channels'] == channels
+                and HEADER_BITS + values_needed(header['length'], header['depth']) <= total_values):
+            return {'type': 'header', 'length': header['length'], 'depth': header['depth'],
+                    'compression': header['compression'], 'attachment': header['attachment'],
+                    'scatter': header['scatter'],
+                    'embedding_rate': (HEADER_BITS + values_needed(header['length'], header['depth']))
+                                      / total_values}
+
+    # Format lama: payload diakhiri |key| lalu delimiter 16 bit, hanya di kanal RGB
+    bits = (pixels.reshape(-1, channels)[:, :3].reshape(-1)[:LEGACY_SCAN_BITS] & 1).astype(np.uint8)
+    end = find_delimiter(bits)
+    if end > 0 and LEGACY_TAIL.search(np.packbits(bits[:end - end % 8]).tobytes()):
+        return {'type': 'legacy', 'length': end // 8,
+                'embedding_rate': (end + 16) / total_values}
+    return None
+
+@monitor_resources
+def analyze_image(image):
+    """Steganalisis LSB satu gambar: signature, chi-square, RS dan perkiraan rasio penyisipan"""
+    try:
+        if isinstance(image, np.ndarray):
+            # Array pixel dianalisis langsung tanpa salinan lewat PIL
+            pixels, mode = image, array_mode(image)
+        else:
+            img = open_image(image)
+            mode = embedding_mode(img)
+            if img.mode != mode:
+                img = img.convert(mode)
+            pixels = np.asarray(img)
+        width, height, _ = pixel_shape(pixels)
+
+        signature = stego_signature(pixels)
+        # Histogram chi-square memakai byte rendah untuk sampel 16 bit
+        values = pixels.reshape(-1)
+        chi_square = chi_square_attack(values if values.dtype == np.uint8 else (values & 0xFF).astype(np.uint8))
+        rs = rs_analysis(pixels)
+
+        if signature is not None:
+            embedding_rate = signature['embedding_rate']
+        else:
+            embedding_rate = max(chi_square['embedded_fraction'], rs['rate'])
+        return {
+            'width': width,
+            'height': height,
+            'mode': mode,
+            'signature': signature,
+            'chi_square': chi_square,
+            'rs': rs,
+            'embedding_rate': float(embedding_rate),
+            'suspicious': bool(signature is not None
+                               or chi_square['embedded_fraction'] > 0
+                               or rs['rate'] >= RS_THRESHOLD)
+        }
+
+    except Exception as e:
+        raise Exception(f"Terjadi kesalahan saat analisis: {str(e)}")
+
 def calculate_mse_psnr(original_image, stego_image):
     """Menghitung MSE dan PSNR antara dua gambar"""
     try:
         # Buka kedua gambar
-        img1 = Image.open(original_image)
-        img2 = Image.open(stego_image)
+        img1 = open_image(original_image)
+        img2 = open_image(stego_image)
         
         # Pastikan kedua gambar dalam mode RGB
         if img1.mode != 'RGB':
@@ -251,15 +1518,8 @@ def calculate_mse_psnr(original_image, stego_image):
             img2 = img2.resize(img1.size)
             img2_array = np.array(img2)
         
-        # Hitung MSE
-        mse = np.mean((img1_array - img2_array) ** 2)
-        
-        # Hitung PSNR
-        if mse == 0:
-            psnr = float('inf')
-        else:
-            max_pixel = 255.0
-            psnr = 20 * np.log10(max_pixel / np.sqrt(mse))
+        # Hitung MSE dan PSNR
+        mse, psnr = calculate_quality(img1_array, img2_array)
         
         # Evaluasi kualitas MSE
         print("\nHasil analisis kualitas gambar:")
@@ -294,94 +1554,857 @@ def calculate_mse_psnr(original_image, stego_image):
         print(f"Debug info - Array 2 shape: {img2_array.shape if 'img2_array' in locals() else 'unknown'}")
         return 0.0, float('inf')
 
-# Initialize character table
-init_char_table()
+# Batch processing dengan process pool. Ukuran pool per proses server;
+# gunicorn.conf.py membaginya dengan jumlah worker (cpu_count // workers) agar
+# satu mesin tidak menjalankan cpu_count x workers proses stego
+POOL_WORKERS = max(1, int(os.environ.get('STEGO_POOL_WORKERS', os.cpu_count() or 1)))
+_executor = None
+_executor_lock = threading.Lock()
 
-# Flask Routes
-@app.route('/')
-def index():
-    return render_template('index.html')
+def pool_context():
+    """Context multiprocessing untuk process pool: forkserver jika tersedia"""
+    # Pool dibuat saat request pertama, ketika thread request dan job sudah
+    # berjalan. fork dari proses itu bisa mewarisi lock (_metrics_lock,
+    # _payload_cache_lock, _jobs_lock) yang sedang dipegang thread lain dan
+    # worker macet di pemakaian pertama. forkserver mem-fork worker dari proses
+    # server tanpa thread yang sudah memuat modul ini lebih dulu
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return None
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload([__name__])
+    return context
 
-@app.route('/encode', methods=['POST'])
-def encode():
+def get_executor():
+    """Mengembalikan process pool bersama, dibuat saat pertama kali dibutuhkan"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Worker harus mewarisi resource tracker proses induk; tracker milik
+            # worker sendiri akan menghapus segmen shared memory saat worker berhenti
+            resource_tracker.ensure_running()
+            _executor = ProcessPoolExecutor(max_workers=POOL_WORKERS, mp_context=pool_context())
+        return _executor
+
+def pool_task(func, *args):
+    """Worker: menjalankan func, mengembalikan (berhasil, hasil atau exception, metrik task ini)"""
     try:
-        # Get form data
-        message = request.form.get('message')
-        key = request.form.get('key')
-        image = request.files.get('image')
+        return True, func(*args), take_metrics()
+    except Exception as e:
+        return False, e, take_metrics()
 
-        # Print key to terminal
-        print("\n[*] Encryption Key Used:", key)
+def submit_task(func, *args):
+    """Mengirim func ke process pool lewat pool_task"""
+    return get_executor().submit(pool_task, func, *args)
 
-        if not all([message, key, image]):
-            return jsonify({
-                'status': 'error',
-                'message': 'Missing required fields'
-            }), 400
+def task_result(future):
+    """Hasil task process pool; metrik dari worker digabung ke /metrics proses ini"""
+    ok, value, snapshot = future.result()
+    merge_metrics(snapshot)
+    if not ok:
+        raise value
+    return value
 
-        try:
-            # Convert key to integer
-            key = int(key)
-        except ValueError:
-            return jsonify({
-                'status': 'error',
-                'message': 'Encryption key harus berupa angka'
-            }), 400
+# Transport pixel antar proses lewat multiprocessing.shared_memory: pixel
+# gambar ditulis sekali ke segmen bersama, worker menerima nama segmen (bukan
+# array yang di-pickle), menyisipkan in-place, dan proses induk membaca hasil
+# dari segmen yang sama tanpa salinan. Segmen dihapus saat referensi terakhir
+# dilepas (view array di proses induk di-garbage-collect atau release_array)
+_shared_segments = {}
+_shared_closing = []
+_shared_lock = threading.Lock()
 
-        # Save uploaded image
-        filename = secure_filename(image.filename)
-        image_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        image.save(image_path)
+def share_array(shape, dtype):
+    """Membuat segmen shared memory untuk array, mengembalikan (deskriptor, view array di segmen)"""
+    dtype = np.dtype(dtype)
+    shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+    pixels = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    with _shared_lock:
+        _shared_segments[shm.name] = {'shm': shm, 'refs': 1}
+    # Referensi pertama dimiliki view: dilepas otomatis saat view dibuang
+    weakref.finalize(pixels, release_array, shm.name)
+    return {'name': shm.name, 'shape': tuple(shape), 'dtype': dtype.str}, pixels
 
-        # Encode the image
-        try:
-            output_path = encode_image(image_path, message, key)
-            
-            # Calculate MSE and PSNR
-            mse, psnr = calculate_mse_psnr(image_path, output_path)
+def retain_array(name):
+    """Menambah referensi segmen shared memory"""
+    with _shared_lock:
+        _shared_segments[name]['refs'] += 1
 
-            # Get encrypted message
-            encrypted_text = encrypt_custom(message, key)
+def release_array(name):
+    """Melepas satu referensi segmen shared memory, segmen dihapus saat referensi habis"""
+    with _shared_lock:
+        entry = _shared_segments.get(name)
+        if entry is None:
+            return
+        entry['refs'] -= 1
+        if entry['refs'] > 0:
+            return
+        del _shared_segments[name]
+        entry['shm'].unlink()
+        _shared_closing.append(entry['shm'])
+        # Segmen baru bisa ditutup setelah buffer-nya tidak dipakai array lagi
+        for shm in list(_shared_closing):
+            try:
+                shm.close()
+                _shared_closing.remove(shm)
+            except BufferError:
+                pass
 
-            # Read the encoded image and convert to base64
-            with open(output_path, 'rb') as img_file:
-                encoded_image = base64.b64encode(img_file.read()).decode('utf-8')
+def share_image(image, memory_budget=STRIP_MEMORY_BUDGET):
+    """Decode gambar langsung ke segmen shared memory per pita baris, mengembalikan (deskriptor, view)"""
+    img = open_image(image)
+    mode = embedding_mode(img)
+    if img.mode != mode:
+        img = img.convert(mode)
+    # Bentuk dan dtype array mengikuti np.asarray(img) untuk mode tersebut
+    width, height = img.size
+    sample = np.asarray(img.crop((0, 0, width, min(height, 1))))
+    descriptor, pixels = share_array((height,) + sample.shape[1:], sample.dtype)
+    band_rows = strip_rows(img, memory_budget, values_factor=1)
+    for top in range(0, height, band_rows):
+        bottom = min(top + band_rows, height)
+        pixels[top:bottom] = np.asarray(img.crop((0, top, width, bottom)))
+    return descriptor, pixels
 
-            # Clean up temporary files
-            os.remove(image_path)
-            os.remove(output_path)
+def attach_array(descriptor):
+    """Worker: membuka segmen shared memory dari deskriptor, mengembalikan (segmen, view array)"""
+    shm = shared_memory.SharedMemory(name=descriptor['name'])
+    return shm, np.ndarray(descriptor['shape'], dtype=np.dtype(descriptor['dtype']), buffer=shm.buf)
 
-            return jsonify({
-                'status': 'success',
-                'image': f'data:image/png;base64,{encoded_image}',
-                'mse': float(mse),
-                'psnr': float(psnr),
-                'encrypted_message': encrypted_text
-            })
+def shared_encode_item(descriptor, message, key, metrics, depth=1, compression='none',
+                       compression_level=DEFAULT_COMPRESSION_LEVEL, filename=None, scatter=False):
+    """Worker: menyisipkan pesan in-place ke array di shared memory"""
+    shm, pixels = attach_array(descriptor)
+    try:
+        return encode_array(pixels, message, key, metrics=metrics, depth=depth,
+                            compression=compression, compression_level=compression_level,
+                            filename=filename, scatter=scatter)
+    finally:
+        del pixels
+        shm.close()
 
-        except Exception as e:
-            if os.path.exists(image_path):
-                os.remove(image_path)
-            return jsonify({
-                'status': 'error',
-                'message': str(e)
-            }), 500
+def shared_decode_item(descriptor, key):
+    """Worker: mengekstrak dan mendekripsi pesan dari array di shared memory"""
+    shm, pixels = attach_array(descriptor)
+    try:
+        entry = extract_payload(pixels, stage_clock('decode'), key=key)
+        return None if entry is None else decrypt_payload(entry, key)
+    finally:
+        del pixels
+        shm.close()
+
+def encode_shared(image, secret_text, key, metrics='fast', depth=1, compression='none',
+                  compression_level=DEFAULT_COMPRESSION_LEVEL, filename=None, scatter=False):
+    """Encode di process pool lewat shared memory, mengembalikan (array stego di segmen, metrik)"""
+    # Array hasil adalah view segmen bersama; segmen dihapus setelah array dibuang
+    descriptor, pixels = share_image(image)
+    quality = task_result(submit_task(shared_encode_item, descriptor, secret_text, key, metrics,
+                                      depth, compression, compression_level, filename, scatter))
+    return pixels, quality
+
+def decode_shared(image, key):
+    """Decode di process pool lewat shared memory"""
+    descriptor, pixels = share_image(image)
+    try:
+        return task_result(submit_task(shared_decode_item, descriptor, key))
+    finally:
+        del pixels
 
+def batch_encode_item(index, name, data, message, key, metrics, depth=1, compression='none',
+                      compression_level=DEFAULT_COMPRESSION_LEVEL, filename=None,
+                      output_format=None, compress_level=None, scatter=False):
+    """Worker: menyisipkan pesan ke satu gambar dalam batch"""
+    try:
+        # Format keluaran dicek dari header gambar sebelum penyisipan
+        output_format = output_format_for(embedding_mode(open_image(io.BytesIO(data))), output_format)
+        stego_image, quality = encode_image(io.BytesIO(data), message, key, metrics=metrics,
+                                            output='image', depth=depth, compression=compression,
+                                            compression_level=compression_level,
+                                            filename=filename, scatter=scatter)
+        result = {
+            'index': index,
+            'name': name,
+            'status': 'success',
+            'image': image_to_bytes(stego_image, output_format, compress_level),
+            'format': output_format,
+            'depth': depth,
+            'scatter': scatter
+        }
+        if quality is not None:
+            result['mse'] = float(quality['mse'])
+            result['psnr'] = float(quality['psnr'])
+            result['compression'] = quality['compression']
+            result['payload_bytes'] = quality['payload_bytes']
+        return result
     except Exception as e:
-        return jsonify({
-            'status': 'error',
-            'message': str(e)
-        }), 500
+        return {'index': index, 'name': name, 'status': 'error', 'message': str(e)}
 
-@app.route('/decode', methods=['POST'])
-def decode():
+def batch_decode_item(index, name, data, key):
+    """Worker: mengekstrak pesan dari satu gambar dalam batch"""
     try:
-        # Get form data
-        key = request.form.get('key')
-        image = request.files.get('image')
+        result = decode_image(io.BytesIO(data), key)
+        if result is None:
+            return {'index': index, 'name': name, 'status': 'error', 'message': 'Pesan tidak ditemukan'}
+        item = {'index': index, 'name': name, 'status': result['status'], 'message': result['message']}
+        if 'encrypted' in result:
+            item.update(decode_fields(result))
+        return item
+    except Exception as e:
+        return {'index': index, 'name': name, 'status': 'error', 'message': str(e)}
 
-        # Print key to terminal
-        print("\n[*] Decryption Key Used:", key)
+def analyze_item(index, name, data):
+    """Worker: steganalisis satu gambar dalam batch"""
+    try:
+        return {'index': index, 'name': name, 'status': 'success', **analyze_image(io.BytesIO(data))}
+    except Exception as e:
+        return {'index': index, 'name': name, 'status': 'error', 'message': str(e)}
+
+def run_batch(func, files, *args):
+    """Menjalankan func untuk setiap file di process pool, hasil di-yield saat selesai"""
+    futures = [submit_task(func, index, name, data, *args)
+               for index, (name, data) in enumerate(files)]
+    for future in as_completed(futures):
+        yield task_result(future)
+
+# Batas request berat (encode/decode) yang berjalan bersamaan per proses.
+# Request di atas batas langsung ditolak 503 + Retry-After alih-alih mengantre
+# dan memperlambat request lain. Job asinkron memakai slot yang sama.
+MAX_INFLIGHT = max(1, int(os.environ.get('STEGO_MAX_INFLIGHT', os.cpu_count() or 1)))
+INFLIGHT_WAIT = float(os.environ.get('STEGO_INFLIGHT_WAIT', '0'))  # Detik menunggu slot kosong
+RETRY_AFTER = int(os.environ.get('STEGO_RETRY_AFTER', 1))
+_inflight = threading.BoundedSemaphore(MAX_INFLIGHT)
+_inflight_lock = threading.Lock()
+_inflight_count = 0
+
+def acquire_inflight(timeout=None):
+    """Mengambil satu slot in-flight (menunggu paling lama timeout detik), False jika penuh"""
+    global _inflight_count
+    if not _inflight.acquire(timeout=timeout):
+        return False
+    with _inflight_lock:
+        _inflight_count += 1
+    return True
+
+def release_inflight():
+    """Melepas satu slot in-flight"""
+    global _inflight_count
+    with _inflight_lock:
+        _inflight_count -= 1
+    _inflight.release()
+
+@contextmanager
+def inflight_slot():
+    """Menunggu slot in-flight untuk satu job lalu melepasnya setelah selesai"""
+    acquire_inflight()
+    try:
+        yield
+    finally:
+        release_inflight()
+
+# Job asinkron: dijalankan di worker pool lokal, status dan hasil disimpan di
+# SQLite (STEGO_JOB_DB) sehingga job yang dibuat di satu worker gunicorn bisa
+# dipantau dan diambil dari worker lain tanpa broker terpisah.
+# Pool berisi MAX_INFLIGHT thread dan setiap job memegang satu slot in-flight
+# selama berjalan, jadi job dan request sinkron bersama-sama tidak melebihi
+# batas penyisipan bersamaan per proses.
+# Dengan STEGO_SHARED_MEMORY=1 penyisipan job encode dijalankan di process pool
+# dengan pixel dikirim lewat shared memory (perlu /dev/shm yang cukup besar)
+SHARED_MEMORY_JOBS = os.environ.get('STEGO_SHARED_MEMORY', '0') == '1'
+JOB_DB = os.environ.get('STEGO_JOB_DB', os.path.join(tempfile.gettempdir(), 'stego_jobs.sqlite3'))
+JOB_TTL = 60 * 60  # Hasil job disimpan selama 1 jam setelah selesai
+# Batas job: job queued/running per proses (masing-masing memegang upload
+# mentah di antrean) dan total byte hasil yang disimpan di database. Job di
+# atas batas ditolak 503; hasil terlama dibuang lebih dulu jika batas byte terlampaui
+MAX_JOBS = max(1, int(os.environ.get('STEGO_MAX_JOBS', 4 * MAX_INFLIGHT)))
+JOB_RESULT_BYTES = int(os.environ.get('STEGO_JOB_RESULT_BYTES', 256 * 1024 * 1024))
+JOB_DATA_FIELDS = {'encode': 'image', 'decode': 'attachment'}  # Field hasil biner per jenis job
+_jobs_lock = threading.Lock()
+_jobs_active = 0
+_job_db_ready = False
+_job_executor = None
+
+def get_job_executor():
+    """Mengembalikan worker pool untuk job, dibuat saat pertama kali dibutuhkan"""
+    global _job_executor
+    with _jobs_lock:
+        if _job_executor is None:
+            _job_executor = ThreadPoolExecutor(max_workers=MAX_INFLIGHT,
+                                               thread_name_prefix='stego-job')
+        return _job_executor
+
+@contextmanager
+def job_db():
+    """Koneksi SQLite ke penyimpanan job, di-commit saat blok selesai"""
+    global _job_db_ready
+    db = sqlite3.connect(JOB_DB, timeout=30)
+    try:
+        if not _job_db_ready:
+            # WAL: polling status dari worker lain tidak menunggu penulisan progress
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                status TEXT NOT NULL,
+                progress TEXT NOT NULL,
+                created REAL NOT NULL,
+                finished REAL,
+                error TEXT,
+                result TEXT,
+                data BLOB,
+                size INTEGER NOT NULL DEFAULT 0
+            )""")
+            db.execute('CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished)')
+            _job_db_ready = True
+        with db:
+            yield db
+    finally:
+        db.close()
+
+def prune_jobs(db):
+    """Menghapus job yang melewati TTL, lalu hasil terlama sampai muat di JOB_RESULT_BYTES"""
+    # Job yang belum selesai setelah TTL (worker-nya mati) ikut dihapus
+    db.execute('DELETE FROM jobs WHERE COALESCE(finished, created) < ?', (time.time() - JOB_TTL,))
+    total, = db.execute('SELECT COALESCE(SUM(size), 0) FROM jobs').fetchone()
+    if total <= JOB_RESULT_BYTES:
+        return
+    rows = db.execute('SELECT id, size FROM jobs WHERE finished IS NOT NULL ORDER BY finished').fetchall()
+    for job_id, size in rows:
+        if total <= JOB_RESULT_BYTES:
+            break
+        db.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+        total -= size
+
+def create_job(job_type):
+    """Mendaftarkan job baru dengan status queued, None jika antrean job penuh"""
+    global _jobs_active
+    job = {
+        'id': uuid.uuid4().hex,
+        'type': job_type,
+        'status': 'queued',
+        'progress': {},
+        'created': time.time(),
+        'finished': None,
+        'result': None,
+        'error': None
+    }
+    with _jobs_lock:
+        if _jobs_active >= MAX_JOBS:
+            return None
+        _jobs_active += 1
+    try:
+        with job_db() as db:
+            prune_jobs(db)
+            db.execute('INSERT INTO jobs (id, type, status, progress, created) VALUES (?, ?, ?, ?, ?)',
+                       (job['id'], job_type, job['status'], '{}', job['created']))
+    except Exception:
+        with _jobs_lock:
+            _jobs_active -= 1
+        raise
+    return job
+
+def finish_job(job, status, result=None, error=None):
+    """Menandai job selesai dan menyimpan hasilnya dalam batas JOB_RESULT_BYTES"""
+    global _jobs_active
+    # Field biner (gambar/lampiran) disimpan sebagai BLOB, sisanya JSON
+    result = dict(result or {})
+    data = result.pop(JOB_DATA_FIELDS[job['type']], None)
+    encoded = json.dumps(result) if status == 'done' else None
+    size = len(data or b'') + len(encoded or '')
+    if size > JOB_RESULT_BYTES:
+        status, encoded, data, size = 'error', None, None, 0
+        error = 'Hasil job melebihi batas penyimpanan'
+    if status == 'done':
+        job['progress']['stage'] = 'done'
+    job.update(status=status, error=error, finished=time.time())
+    try:
+        with job_db() as db:
+            db.execute('UPDATE jobs SET status = ?, progress = ?, finished = ?, error = ?, result = ?, '
+                       'data = ?, size = ? WHERE id = ?',
+                       (status, json.dumps(job['progress']), job['finished'], error, encoded, data,
+                        size, job['id']))
+            prune_jobs(db)
+    finally:
+        with _jobs_lock:
+            _jobs_active -= 1
+
+def get_job(job_id, with_result=False):
+    """Mengambil job berdasarkan id, None jika tidak ada (atau sudah dibuang)"""
+    columns = 'id, type, status, progress, created, finished, error'
+    if with_result:
+        columns += ', result, data'
+    with job_db() as db:
+        row = db.execute(f'SELECT {columns} FROM jobs WHERE id = ? AND COALESCE(finished, created) >= ?',
+                         (job_id, time.time() - JOB_TTL)).fetchone()
+    if row is None:
+        return None
+    job = {
+        'id': row[0],
+        'type': row[1],
+        'status': row[2],
+        'progress': json.loads(row[3]),
+        'created': row[4],
+        'finished': row[5],
+        'error': row[6],
+        'result': None
+    }
+    if with_result and row[7] is not None:
+        job['result'] = json.loads(row[7])
+        if row[8] is not None:
+            job['result'][JOB_DATA_FIELDS[job['type']]] = bytes(row[8])
+    return job
+
+def update_job(job, progress=None, **fields):
+    """Memperbarui status dan progress job (dipanggil dari thread yang menjalankan job)"""
+    job.update(fields)
+    if progress:
+        job['progress'].update(progress)
+    with job_db() as db:
+        db.execute('UPDATE jobs SET status = ?, progress = ? WHERE id = ?',
+                   (job['status'], json.dumps(job['progress']), job['id']))
+
+def job_status(job):
+    """Representasi JSON status job (tanpa data hasil)"""
+    status = {
+        'job_id': job['id'],
+        'type': job['type'],
+        'status': job['status'],
+        'progress': dict(job['progress']),
+        'created': job['created'],
+        'finished': job['finished']
+    }
+    if job['error']:
+        status['message'] = job['error']
+    if job['status'] == 'done':
+        status['result_url'] = f"/jobs/{job['id']}/result"
+    return status
+
+def run_encode_job(job, data, message, key, metrics, depth=1, compression='none',
+                   compression_level=DEFAULT_COMPRESSION_LEVEL, filename=None,
+                   output_format=None, compress_level=None, scatter=False):
+    """Menjalankan job encode di worker pool"""
+    # Job menunggu di status queued sampai slot in-flight kosong
+    with inflight_slot():
+        update_job(job, status='running')
+        try:
+            if SHARED_MEMORY_JOBS:
+                update_job(job, progress={'stage': 'embed'})
+                stego_image, quality = encode_shared(io.BytesIO(data), message, key, metrics=metrics,
+                                                     depth=depth, compression=compression,
+                                                     compression_level=compression_level,
+                                                     filename=filename, scatter=scatter)
+            else:
+                stego_image, quality = encode_image(io.BytesIO(data), message, key, metrics=metrics,
+                                                    progress=lambda **p: update_job(job, progress=p),
+                                                    output='image', depth=depth, compression=compression,
+                                                    compression_level=compression_level,
+                                                    filename=filename, scatter=scatter)
+            update_job(job, progress={'stage': 'save'})
+            result = {
+                'image': image_to_bytes(stego_image, output_format, compress_level),
+                'format': output_format,
+                'encrypted_message': encrypted_message(message, key),
+                'depth': depth,
+                'scatter': scatter
+            }
+            if quality is not None:
+                result['mse'] = float(quality['mse'])
+                result['psnr'] = float(quality['psnr'])
+                result['compression'] = quality['compression']
+                result['payload_bytes'] = quality['payload_bytes']
+            finish_job(job, 'done', result)
+        except Exception as e:
+            finish_job(job, 'error', error=str(e))
+
+def run_decode_job(job, data, key):
+    """Menjalankan job decode di worker pool"""
+    # Job menunggu di status queued sampai slot in-flight kosong
+    with inflight_slot():
+        update_job(job, status='running')
+        try:
+            result = decode_image(io.BytesIO(data), key,
+                                  progress=lambda **p: update_job(job, progress=p))
+            if result is None:
+                raise ValueError('Pesan tidak ditemukan di dalam gambar')
+            finish_job(job, 'done', result)
+        except Exception as e:
+            finish_job(job, 'error', error=str(e))
+
+def busy_response():
+    """Respons 503 + Retry-After untuk request yang ditolak karena server penuh"""
+    inc_counter('stego_rejected_requests_total', route=request.path)
+    response = jsonify({
+        'status': 'error',
+        'message': 'Server sedang sibuk, coba lagi nanti'
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(RETRY_AFTER)
+    return response
+
+def limit_inflight(view):
+    """Decorator route: membatasi request berat bersamaan, 503 + Retry-After jika penuh"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not acquire_inflight(INFLIGHT_WAIT):
+            return busy_response()
+        try:
+            result = view(*args, **kwargs)
+        except BaseException:
+            release_inflight()
+            raise
+        # Respons generator (NDJSON batch) masih bekerja setelah view selesai,
+        # slot baru dilepas saat respons ditutup. send_file (direct_passthrough)
+        # hanya mengirim bytes yang sudah jadi.
+        if isinstance(result, Response) and result.is_streamed and not result.direct_passthrough:
+            result.call_on_close(release_inflight)
+        else:
+            release_inflight()
+        return result
+    return wrapper
+
+# Flask Routes
+bp = Blueprint('stego', __name__)
+
+def request_flag(name):
+    """Membaca flag boolean dari query string atau form"""
+    return request.values.get(name, '').lower() in ('1', 'true', 'yes')
+
+def read_secret():
+    """Membaca rahasia dari form: lampiran file 'attachment' (bytes) atau teks 'message'"""
+    attachment = request.files.get('attachment')
+    if attachment:
+        return attachment.read(), os.path.basename(attachment.filename or DEFAULT_ATTACHMENT_NAME)
+    return request.form.get('message'), None
+
+def encrypted_message(message, key):
+    """Teks terenkripsi untuk respons encode, kosong untuk lampiran biner"""
+    return '' if is_attachment(message) else encrypt_custom(message, key)
+
+# Batas panjang header X-Encrypted-Message (setelah percent-encoding). Reverse
+# proxy menolak header besar (nginx: 4-8 KB), jadi pesan yang lebih panjang
+# hanya tersedia di respons JSON
+ENCRYPTED_HEADER_LIMIT = 4096
+
+def set_encrypted_header(response, text):
+    """Menambahkan teks terenkripsi ke header respons biner jika cukup pendek"""
+    value = quote(text)
+    response.headers['X-Encrypted-Message-Length'] = str(len(text))
+    if len(value) <= ENCRYPTED_HEADER_LIMIT:
+        response.headers['X-Encrypted-Message'] = value
+
+def decode_fields(result):
+    """Field JSON hasil decode, lampiran biner dikirim sebagai data URL base64"""
+    fields = {
+        'message': result['message'],
+        'encrypted_message': result.get('encrypted', '')
+    }
+    if 'attachment' in result:
+        fields['filename'] = result['filename']
+        fields['attachment'] = ('data:application/octet-stream;base64,'
+                                + base64.b64encode(result['attachment']).decode('utf-8'))
+    return fields
+
+def parse_depth():
+    """Membaca jumlah bit LSB per kanal dari form, None jika tidak valid"""
+    try:
+        depth = int(request.values.get('depth', 1))
+    except ValueError:
+        return None
+    return depth if depth in LSB_DEPTHS else None
+
+def parse_compression():
+    """Membaca mode dan level kompresi dari form, None jika tidak valid"""
+    compression = request.values.get('compression', 'none')
+    try:
+        level = int(request.values.get('compression_level', DEFAULT_COMPRESSION_LEVEL))
+    except ValueError:
+        return None
+    if compression not in COMPRESSION_MODES or level not in COMPRESSION_LEVELS:
+        return None
+    return compression, level
+
+def parse_output():
+    """Membaca format keluaran (None = default deployment) dan compress_level dari form, None jika tidak valid"""
+    output_format = request.values.get('output_format')
+    try:
+        compress_level = int(request.values.get('compress_level', OUTPUT_COMPRESS_LEVEL))
+    except ValueError:
+        return None
+    if output_format is not None:
+        output_format = output_format.lower()
+        if output_format not in OUTPUT_FORMATS:
+            return None
+    if compress_level not in COMPRESS_LEVELS:
+        return None
+    return output_format, compress_level
+
+def parse_encode_options():
+    """Membaca opsi encode dari form, mengembalikan (opsi, pesan error jika tidak valid)"""
+    # Dipakai /encode, /batch/encode dan /jobs/encode
+    metrics = request.form.get('metrics', 'fast')
+    if metrics not in METRICS_MODES:
+        return None, f"metrics harus salah satu dari: {', '.join(METRICS_MODES)}"
+
+    depth = parse_depth()
+    if depth is None:
+        return None, f"depth harus antara {LSB_DEPTHS[0]} dan {LSB_DEPTHS[-1]}"
+
+    compression = parse_compression()
+    if compression is None:
+        return None, (f"compression harus salah satu dari: {', '.join(COMPRESSION_MODES)} "
+                      f"dengan compression_level 0-9")
+
+    output = parse_output()
+    if output is None:
+        return None, (f"output_format harus salah satu dari: {', '.join(OUTPUT_FORMATS)} "
+                      f"dengan compress_level 0-9")
+
+    return {
+        'metrics': metrics,
+        'depth': depth,
+        'compression': compression[0],
+        'compression_level': compression[1],
+        'output_format': output[0],
+        'compress_level': output[1],
+        # Payload disebar ke posisi yang ditentukan kunci, bukan urutan raster
+        'scatter': request_flag('scatter')
+    }, None
+
+def wants_binary_response(mimetype='image/png'):
+    """Cek apakah klien meminta respons gambar langsung, bukan JSON base64"""
+    if request.values.get('response') == 'binary':
+        return True
+    return request.accept_mimetypes.best_match(['application/json', mimetype]) == mimetype
+
+def image_data_url(data, format):
+    """Data URL base64 untuk gambar hasil encode"""
+    return f"data:{OUTPUT_FORMATS[format]['mimetype']};base64," + base64.b64encode(data).decode('utf-8')
+
+# Batas isi batch: jumlah gambar dan total ukuran zip setelah diekstrak. Upload
+# dibatasi MAX_CONTENT_LENGTH, tetapi isi zip bisa mengembang jauh lebih besar
+BATCH_MAX_FILES = int(os.environ.get('STEGO_BATCH_MAX_FILES', 1000))
+ARCHIVE_MAX_BYTES = int(os.environ.get('STEGO_ARCHIVE_MAX_BYTES', 4 * MAX_CONTENT_LENGTH))
+
+def collect_batch_files():
+    """Mengumpulkan gambar batch dari upload multipart 'images' dan/atau zip 'archive'"""
+    files = []
+    for image in request.files.getlist('images'):
+        files.append((os.path.basename(image.filename or 'image'), image.read()))
+    archive = request.files.get('archive')
+    if archive:
+        try:
+            with zipfile.ZipFile(io.BytesIO(archive.read())) as zf:
+                members = [info for info in zf.infolist() if not info.is_dir()]
+                # Ukuran dicek dari direktori zip sebelum ada yang didekompresi;
+                # zf.read() tidak pernah menghasilkan lebih dari file_size
+                if len(files) + len(members) > BATCH_MAX_FILES:
+                    raise ValueError(f"Batch maksimal {BATCH_MAX_FILES} gambar")
+                if sum(info.file_size for info in members) > ARCHIVE_MAX_BYTES:
+                    raise ValueError(f"Isi arsip melebihi batas {ARCHIVE_MAX_BYTES} byte")
+                for info in members:
+                    files.append((os.path.basename(info.filename), zf.read(info)))
+        except (zipfile.BadZipFile, zlib.error, EOFError):
+            raise ValueError("Arsip zip tidak valid")
+    if len(files) > BATCH_MAX_FILES:
+        raise ValueError(f"Batch maksimal {BATCH_MAX_FILES} gambar")
+    return files
+
+def ndjson_response(results):
+    """Men-stream hasil batch sebagai NDJSON, satu baris per gambar"""
+    def generate():
+        for result in results:
+            if 'image' in result:
+                result['image'] = image_data_url(result['image'], result['format'])
+            yield json.dumps(result) + '\n'
+    return Response(generate(), mimetype='application/x-ndjson')
+
+def zip_response(results, download_name):
+    """Mengemas hasil batch ke zip beserta results.json berisi status per gambar"""
+    buffer = io.BytesIO()
+    manifest = []
+    used_names = set()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as zf:
+        for result in sorted(results, key=lambda r: r['index']):
+            if 'image' in result:
+                extension = OUTPUT_FORMATS[result['format']]['extension']
+                output_name = "encoded_" + os.path.splitext(result['name'])[0] + extension
+                if output_name in used_names:
+                    output_name = f"encoded_{result['index']}_" + os.path.splitext(result['name'])[0] + extension
+                used_names.add(output_name)
+                zf.writestr(output_name, result.pop('image'))
+                result['output'] = output_name
+            manifest.append(result)
+        zf.writestr('results.json', json.dumps(manifest, indent=2))
+    buffer.seek(0)
+    return send_file(buffer, mimetype='application/zip', download_name=download_name)
+
+@bp.route('/')
+def index():
+    return render_template('index.html')
+
+@bp.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/capacity', methods=['POST'])
+def capacity():
+    try:
+        # Get form data (one 'image' or several 'images')
+        key = request.form.get('key')
+        images = request.files.getlist('images') + request.files.getlist('image')
+
+        if not images:
+            return jsonify({
+                'status': 'error',
+                'message': 'Missing required fields'
+            }), 400
+
+        if key is not None:
+            try:
+                # Convert key to integer
+                key = int(key)
+            except ValueError:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Encryption key harus berupa angka'
+                }), 400
+
+        # Only the image headers are read, pixels are never decoded
+        results = []
+        for image in images:
+            try:
+                result = image_capacity(image.stream, key)
+                result['status'] = 'success'
+            except Exception as e:
+                result = {'status': 'error', 'message': str(e)}
+            result['name'] = image.filename
+            results.append(result)
+
+        return jsonify({
+            'status': 'success',
+            'results': results
+        })
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@bp.route('/encode', methods=['POST'])
+@limit_inflight
+def encode():
+    try:
+        # Get form data
+        message, filename = read_secret()
+        key = request.form.get('key')
+        image = request.files.get('image')
+
+        # Print key to terminal
+        print("\n[*] Encryption Key Used:", key)
+
+        if not all([message, key, image]):
+            return jsonify({
+                'status': 'error',
+                'message': 'Missing required fields'
+            }), 400
+
+        try:
+            # Convert key to integer
+            key = int(key)
+        except ValueError:
+            return jsonify({
+                'status': 'error',
+                'message': 'Encryption key harus berupa angka'
+            }), 400
+
+        options, error = parse_encode_options()
+        if error:
+            return jsonify({
+                'status': 'error',
+                'message': error
+            }), 400
+        depth, scatter = options['depth'], options['scatter']
+
+        # Read uploaded image into memory
+        data = image.read()
+
+        # Check that the output encoder can hold the cover's mode before embedding;
+        # only the image header is read here
+        try:
+            output_format = output_format_for(embedding_mode(open_image(io.BytesIO(data))),
+                                              options['output_format'])
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+
+        # Encode the image (MSE and PSNR are computed once, if requested)
+        try:
+            # encode_image decodes its own copy from the bytes and embeds in place
+            stego_image, quality = encode_image(io.BytesIO(data), message, key,
+                                                metrics=options['metrics'],
+                                                output='image', depth=depth,
+                                                compression=options['compression'],
+                                                compression_level=options['compression_level'],
+                                                filename=filename, scatter=scatter)
+
+            # Get encrypted message
+            encrypted_text = encrypted_message(message, key)
+
+            encoder = OUTPUT_FORMATS[output_format]
+            image_data = image_to_bytes(stego_image, output_format, options['compress_level'])
+
+            # Stream image bytes directly, with metrics in response headers
+            if wants_binary_response(encoder['mimetype']):
+                response = send_file(io.BytesIO(image_data), mimetype=encoder['mimetype'],
+                                     download_name='encoded_image' + encoder['extension'])
+                set_encrypted_header(response, encrypted_text)
+                response.headers['X-LSB-Depth'] = str(depth)
+                response.headers['X-Scatter'] = str(int(scatter))
+                if quality is not None:
+                    response.headers['X-MSE'] = str(float(quality['mse']))
+                    response.headers['X-PSNR'] = str(float(quality['psnr']))
+                    response.headers['X-Compression'] = quality['compression']
+                return response
+
+            # Convert the result to base64 for the JSON response
+            response = {
+                'status': 'success',
+                'image': image_data_url(image_data, output_format),
+                'format': output_format,
+                'encrypted_message': encrypted_text,
+                'depth': depth,
+                'scatter': scatter
+            }
+            if quality is not None:
+                response['mse'] = float(quality['mse'])
+                response['psnr'] = float(quality['psnr'])
+                response['compression'] = quality['compression']
+                response['payload_bytes'] = quality['payload_bytes']
+            return jsonify(response)
+
+        except Exception as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 500
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@bp.route('/decode', methods=['POST'])
+@limit_inflight
+def decode():
+    try:
+        # Get form data
+        key = request.form.get('key')
+        image = request.files.get('image')
+
+        # Print key to terminal
+        print("\n[*] Decryption Key Used:", key)
 
         if not all([key, image]):
             return jsonify({
@@ -398,40 +2421,43 @@ def decode():
                 'message': 'Decryption key harus berupa angka'
             }), 400
 
-        # Save uploaded image
-        filename = secure_filename(image.filename)
-        image_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        image.save(image_path)
+        # Read uploaded image into memory
+        image_data = image.read()
 
         try:
             # Decode the image
-            result = decode_image(image_path, key)
-            
-            # Read the image and convert to base64 for preview
-            with open(image_path, 'rb') as img_file:
-                encoded_image = base64.b64encode(img_file.read()).decode('utf-8')
-            
-            # Clean up temporary file
-            if os.path.exists(image_path):
-                os.remove(image_path)
+            result = decode_image(io.BytesIO(image_data), key)
+            if result is None:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Pesan tidak ditemukan di dalam gambar'
+                }), 400
 
             if result['status'] == 'success':
-                return jsonify({
-                    'status': 'success',
-                    'message': result['message'],
-                    'encrypted_message': result.get('encrypted', ''),
-                    'image': f'data:image/png;base64,{encoded_image}'
-                })
+                # Stream an extracted attachment directly when asked
+                if 'attachment' in result and request.values.get('response') == 'binary':
+                    return send_file(io.BytesIO(result['attachment']),
+                                     mimetype='application/octet-stream',
+                                     as_attachment=True,
+                                     download_name=os.path.basename(result['filename'])
+                                     or DEFAULT_ATTACHMENT_NAME)
+                response = {'status': 'success', **decode_fields(result)}
+                status_code = 200
             else:
-                return jsonify({
+                response = {
                     'status': 'error',
-                    'message': result['message'],
-                    'image': f'data:image/png;base64,{encoded_image}'
-                }), 400
+                    'message': result['message']
+                }
+                status_code = 400
+
+            # Only echo the uploaded image back when explicitly requested
+            if request_flag('include_image'):
+                encoded_image = base64.b64encode(image_data).decode('utf-8')
+                response['image'] = f'data:{image.mimetype or "image/png"};base64,{encoded_image}'
+
+            return jsonify(response), status_code
 
         except Exception as e:
-            if os.path.exists(image_path):
-                os.remove(image_path)
             print(f"Decoding error: {str(e)}")
             return jsonify({
                 'status': 'error',
@@ -445,5 +2471,368 @@ def decode():
             'message': str(e)
         }), 500
 
+@bp.route('/decode/sweep', methods=['POST'])
+@limit_inflight
+def decode_sweep():
+    try:
+        # Get form data; no key needed, every key is tried
+        image = request.files.get('image')
+        top = request.values.get('top', str(SWEEP_KEYS))
+
+        if not image:
+            return jsonify({
+                'status': 'error',
+                'message': 'Missing required fields'
+            }), 400
+
+        try:
+            top = int(top)
+        except ValueError:
+            top = 0
+        if not 1 <= top <= SWEEP_KEYS:
+            return jsonify({
+                'status': 'error',
+                'message': f'top harus antara 1 dan {SWEEP_KEYS}'
+            }), 400
+
+        # Extract once, decrypt with all 62 keys in one pass
+        result = sweep_decode(io.BytesIO(image.read()), top=top)
+        if result is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'Pesan tidak ditemukan di dalam gambar'
+            }), 400
+        if result['status'] != 'success':
+            return jsonify(result), 400
+
+        for candidate in result['candidates']:
+            if 'attachment' in candidate:
+                candidate['attachment'] = ('data:application/octet-stream;base64,'
+                                           + base64.b64encode(candidate['attachment']).decode('utf-8'))
+        return jsonify(result)
+
+    except Exception as e:
+        print(f"Sweep error: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@bp.route('/analyze', methods=['POST'])
+@limit_inflight
+def analyze():
+    try:
+        # Get form data: one 'image', several 'images' and/or a zip 'archive'
+        response_format = request.values.get('format', 'json')
+        try:
+            files = collect_batch_files()
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        image = request.files.get('image')
+        if image:
+            files.insert(0, (os.path.basename(image.filename or 'image'), image.read()))
+
+        if not files:
+            return jsonify({
+                'status': 'error',
+                'message': 'Missing required fields'
+            }), 400
+
+        if response_format not in ('json', 'ndjson'):
+            return jsonify({
+                'status': 'error',
+                'message': 'format harus json atau ndjson'
+            }), 400
+
+        # Fan out over the process pool; ndjson streams results as they finish
+        results = run_batch(analyze_item, files)
+        if response_format == 'ndjson':
+            return ndjson_response(results)
+        return jsonify({
+            'status': 'success',
+            'results': sorted(results, key=lambda r: r['index'])
+        })
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@bp.route('/batch/encode', methods=['POST'])
+@limit_inflight
+def batch_encode():
+    try:
+        # Get form data
+        message, filename = read_secret()
+        key = request.form.get('key')
+        response_format = request.values.get('format', 'zip')
+        try:
+            files = collect_batch_files()
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+
+        if not all([message, key, files]):
+            return jsonify({
+                'status': 'error',
+                'message': 'Missing required fields'
+            }), 400
+
+        try:
+            # Convert key to integer
+            key = int(key)
+        except ValueError:
+            return jsonify({
+                'status': 'error',
+                'message': 'Encryption key harus berupa angka'
+            }), 400
+
+        if response_format not in ('zip', 'ndjson'):
+            return jsonify({
+                'status': 'error',
+                'message': 'format harus zip atau ndjson'
+            }), 400
+
+        options, error = parse_encode_options()
+        if error:
+            return jsonify({
+                'status': 'error',
+                'message': error
+            }), 400
+
+        # Fan out over the process pool
+        results = run_batch(batch_encode_item, files, message, key, options['metrics'],
+                            options['depth'], options['compression'], options['compression_level'],
+                            filename, options['output_format'], options['compress_level'],
+                            options['scatter'])
+        if response_format == 'ndjson':
+            return ndjson_response(results)
+        return zip_response(results, 'encoded_images.zip')
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@bp.route('/batch/decode', methods=['POST'])
+@limit_inflight
+def batch_decode():
+    try:
+        # Get form data
+        key = request.form.get('key')
+        try:
+            files = collect_batch_files()
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+
+        if not all([key, files]):
+            return jsonify({
+                'status': 'error',
+                'message': 'Missing required fields'
+            }), 400
+
+        try:
+            # Convert key to integer
+            key = int(key)
+        except ValueError:
+            return jsonify({
+                'status': 'error',
+                'message': 'Decryption key harus berupa angka'
+            }), 400
+
+        # Fan out over the process pool and stream results as they finish
+        return ndjson_response(run_batch(batch_decode_item, files, key))
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@bp.route('/jobs/encode', methods=['POST'])
+def submit_encode_job():
+    try:
+        # Get form data
+        message, filename = read_secret()
+        key = request.form.get('key')
+        image = request.files.get('image')
+
+        if not all([message, key, image]):
+            return jsonify({
+                'status': 'error',
+                'message': 'Missing required fields'
+            }), 400
+
+        try:
+            # Convert key to integer
+            key = int(key)
+        except ValueError:
+            return jsonify({
+                'status': 'error',
+                'message': 'Encryption key harus berupa angka'
+            }), 400
+
+        options, error = parse_encode_options()
+        if error:
+            return jsonify({
+                'status': 'error',
+                'message': error
+            }), 400
+
+        # Only the image header is read here, to reject an output format that
+        # cannot hold the cover's mode before the job is queued
+        data = image.read()
+        try:
+            output_format = output_format_for(embedding_mode(open_image(io.BytesIO(data))),
+                                              options['output_format'])
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+
+        # Queue the job and return its id immediately
+        job = create_job('encode')
+        if job is None:
+            return busy_response()
+        status = job_status(job)
+        get_job_executor().submit(run_encode_job, job, data, message, key, options['metrics'],
+                                  options['depth'], options['compression'],
+                                  options['compression_level'], filename, output_format,
+                                  options['compress_level'], options['scatter'])
+        return jsonify(status), 202
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@bp.route('/jobs/decode', methods=['POST'])
+def submit_decode_job():
+    try:
+        # Get form data
+        key = request.form.get('key')
+        image = request.files.get('image')
+
+        if not all([key, image]):
+            return jsonify({
+                'status': 'error',
+                'message': 'Missing required fields'
+            }), 400
+
+        try:
+            # Convert key to integer
+            key = int(key)
+        except ValueError:
+            return jsonify({
+                'status': 'error',
+                'message': 'Decryption key harus berupa angka'
+            }), 400
+
+        # Queue the job and return its id immediately
+        job = create_job('decode')
+        if job is None:
+            return busy_response()
+        status = job_status(job)
+        get_job_executor().submit(run_decode_job, job, image.read(), key)
+        return jsonify(status), 202
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+def job_info(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Job tidak ditemukan'
+        }), 404
+    return jsonify(job_status(job))
+
+@bp.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = get_job(job_id, with_result=True)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Job tidak ditemukan'
+        }), 404
+    if job['status'] != 'done':
+        return jsonify(job_status(job)), 409
+
+    result = job['result']
+    if job['type'] == 'decode':
+        return jsonify({'status': result['status'], **decode_fields(result)})
+
+    # Encode result: image bytes by default, JSON with base64 when asked
+    encoder = OUTPUT_FORMATS[result['format']]
+    if request.accept_mimetypes.best_match([encoder['mimetype'], 'application/json']) == 'application/json':
+        response = {
+            'status': 'success',
+            'image': image_data_url(result['image'], result['format']),
+            'format': result['format'],
+            'encrypted_message': result['encrypted_message'],
+            'depth': result['depth'],
+            'scatter': result['scatter']
+        }
+        if 'mse' in result:
+            response['mse'] = result['mse']
+            response['psnr'] = result['psnr']
+            response['compression'] = result['compression']
+            response['payload_bytes'] = result['payload_bytes']
+        return jsonify(response)
+
+    response = send_file(io.BytesIO(result['image']), mimetype=encoder['mimetype'],
+                         download_name='encoded_image' + encoder['extension'])
+    set_encrypted_header(response, result['encrypted_message'])
+    response.headers['X-LSB-Depth'] = str(result['depth'])
+    response.headers['X-Scatter'] = str(int(result['scatter']))
+    if 'mse' in result:
+        response.headers['X-MSE'] = str(result['mse'])
+        response.headers['X-PSNR'] = str(result['psnr'])
+        response.headers['X-Compression'] = result['compression']
+    return response
+
+def preload():
+    """Menyiapkan tabel translasi cipher, tabel sweep dan plugin Pillow sebelum melayani request"""
+    # Dipanggil di proses induk (gunicorn --preload) agar worker hasil fork
+    # berbagi tabel yang sudah terisi dan request pertama tidak lebih lambat
+    for shift in range(62):
+        cipher_table(shift)
+    sweep_tables()
+    letter_scores()
+    Image.init()
+
+def create_app(config=None, preload_core=True):
+    """Membuat aplikasi Flask (entry point WSGI: gunicorn 'app:create_app()')"""
+    flask_app = Flask(__name__)
+    flask_app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+    if config:
+        flask_app.config.update(config)
+    flask_app.register_blueprint(bp)
+    if preload_core:
+        preload()
+    return flask_app
+
+# Aplikasi default untuk `python app.py`, `flask --app app` dan test client
+app = create_app(preload_core=False)
+
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    # Server pengembangan; untuk produksi gunakan gunicorn -c gunicorn.conf.py
+    create_app().run(debug=os.environ.get('FLASK_DEBUG', '1') == '1')
+
@@ -0,0 +1,280 @@
+"""Benchmark inti steganografi (cipher, encode, decode, metrik, simpan PNG, analisis)
+serta route Flask /encode dan /decode.
+
+Contoh:
+    python benchmark.py --quick
+    python benchmark.py --sizes 256 1024 --payloads 16 1024 --output bench.json
+    python benchmark.py --output bench_baru.json --compare bench_lama.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import PIL
+from PIL import Image
+
+import app as stego
+
+# Ukuran cover sintetis (sisi persegi), 8K ditulis sebagai lebar x tinggi
+DEFAULT_SIZES = ['256', '1024', '2048', '4096', '7680x4320']
+DEFAULT_PAYLOADS = [16, 1024, 16 * 1024, 256 * 1024]
+QUICK_SIZES = ['256', '1024']
+QUICK_PAYLOADS = [16, 1024]
+BENCH_KEY = 17
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gambar')
+
+def parse_size(size):
+    """Mengubah '1024' atau '7680x4320' menjadi (lebar, tinggi)"""
+    if 'x' in size:
+        width, height = size.lower().split('x')
+        return int(width), int(height)
+    return int(size), int(size)
+
+def synthetic_cover(width, height, seed=0):
+    """Membuat cover RGB sintetis yang deterministik"""
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+
+def load_covers(sizes, include_samples):
+    """Mengumpulkan daftar (nama, array RGB) untuk cover sintetis dan contoh di gambar/"""
+    covers = []
+    for size in sizes:
+        width, height = parse_size(size)
+        covers.append((f'synthetic_{width}x{height}', synthetic_cover(width, height)))
+    if include_samples and os.path.isdir(SAMPLE_DIR):
+        for name in sorted(os.listdir(SAMPLE_DIR)):
+            if name.lower().endswith('.png') and not name.startswith('encoded_'):
+                img = Image.open(os.path.join(SAMPLE_DIR, name)).convert('RGB')
+                covers.append((name, np.array(img)))
+    return covers
+
+def make_message(length, seed=0):
+    """Membuat pesan ASCII deterministik sepanjang length byte"""
+    rng = np.random.default_rng(seed)
+    alphabet = np.frombuffer(b'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 ', dtype=np.uint8)
+    return rng.choice(alphabet, size=length).tobytes().decode('ascii')
+
+def quiet(func):
+    """Menjalankan func tanpa output print dari inti steganografi"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func()
+
+def time_call(func, repeat, warmup=1):
+    """Mengukur durasi func sebanyak repeat kali (setelah warmup)"""
+    for _ in range(warmup):
+        quiet(func)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        quiet(func)
+        times.append(time.perf_counter() - start)
+    return times
+
+def peak_memory(func):
+    """Mengukur puncak alokasi memori func dengan tracemalloc (run terpisah dari timing)"""
+    tracemalloc.start()
+    try:
+        quiet(func)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+def summarize(times):
+    """Ringkasan latensi dalam detik: persentil, rata-rata, min, max"""
+    values = np.array(times)
+    return {
+        'p50': float(np.percentile(values, 50)),
+        'p90': float(np.percentile(values, 90)),
+        'p99': float(np.percentile(values, 99)),
+        'mean': float(values.mean()),
+        'min': float(values.min()),
+        'max': float(values.max())
+    }
+
+def run_case(results, stage, mode, cover_name, cover, payload_bytes, func, repeat, measure_memory):
+    """Menjalankan satu kasus benchmark dan menambahkan hasilnya ke results"""
+    times = time_call(func, repeat)
+    latency = summarize(times)
+    megapixels = cover.shape[0] * cover.shape[1] / 1e6
+    result = {
+        'stage': stage,
+        'mode': mode,
+        'cover': cover_name,
+        'width': int(cover.shape[1]),
+        'height': int(cover.shape[0]),
+        'payload_bytes': payload_bytes,
+        'runs': repeat,
+        'latency': latency,
+        'throughput_mpix_s': megapixels / latency['p50'] if latency['p50'] else None,
+        'payload_bytes_s': payload_bytes / latency['p50'] if latency['p50'] else None
+    }
+    if measure_memory:
+        result['peak_memory_bytes'] = peak_memory(func)
+    results.append(result)
+    print(f"{stage:<16} {mode:<6} {cover_name:<26} {payload_bytes:>8} B  "
+          f"p50 {latency['p50'] * 1000:9.2f} ms  p99 {latency['p99'] * 1000:9.2f} ms", flush=True)
+
+def bench_cover(results, cover_name, cover, payloads, repeat, measure_memory, routes):
+    """Menjalankan seluruh tahap untuk satu cover dan semua ukuran payload"""
+    client = stego.app.test_client() if routes else None
+    cover_png = stego.image_to_bytes(cover)
+
+    for payload_bytes in payloads:
+        # Header + payload + '|key|' harus muat di LSB cover
+        if (stego.HEADER_SIZE + payload_bytes + 8) * 8 > cover.size:
+            print(f"skip             {cover_name:<33} {payload_bytes:>8} B  (melebihi kapasitas)")
+            continue
+        message = make_message(payload_bytes)
+        case = (cover_name, cover, payload_bytes)
+
+        run_case(results, 'encrypt', '-', *case,
+                 lambda: stego.encrypt_custom(message, BENCH_KEY), repeat, measure_memory)
+        for mode in stego.METRICS_MODES:
+            run_case(results, 'encode', mode, *case,
+                     lambda: stego.encode_image(cover, message, BENCH_KEY, metrics=mode),
+                     repeat, measure_memory)
+        for depth in stego.LSB_DEPTHS[1:]:
+            run_case(results, 'encode_depth', f'k{depth}', *case,
+                     lambda: stego.encode_image(cover, message, BENCH_KEY, metrics='fast', depth=depth),
+                     repeat, measure_memory)
+        for compression in stego.COMPRESSION_MODES[1:]:
+            run_case(results, 'encode_compress', compression, *case,
+                     lambda: stego.encode_image(cover, message, BENCH_KEY, metrics='fast',
+                                                compression=compression),
+                     repeat, measure_memory)
+
+        run_case(results, 'encode_scatter', 'fast', *case,
+                 lambda: stego.encode_image(cover, message, BENCH_KEY, metrics='fast', scatter=True),
+                 repeat, measure_memory)
+        # Decode PNG ke shared memory lalu sisipkan in-place di process pool
+        run_case(results, 'encode_shared', 'fast', *case,
+                 lambda: stego.encode_shared(cover_png, message, BENCH_KEY, metrics='fast'),
+                 repeat, measure_memory)
+
+        stego_array, _ = quiet(lambda: stego.encode_image(cover, message, BENCH_KEY, metrics='none'))
+        stego_png = stego.image_to_bytes(stego_array)
+        run_case(results, 'metrics', 'full', *case,
+                 lambda: stego.calculate_quality(cover, stego_array), repeat, measure_memory)
+        for output_format in stego.OUTPUT_FORMATS:
+            run_case(results, 'save', output_format, *case,
+                     lambda: stego.image_to_bytes(stego_array, output_format), repeat, measure_memory)
+        run_case(results, 'save', 'png1', *case,
+                 lambda: stego.image_to_bytes(stego_array, 'png', 1), repeat, measure_memory)
+        run_case(results, 'analyze', 'array', *case,
+                 lambda: stego.analyze_image(stego_array), repeat, measure_memory)
+        run_case(results, 'decode', 'array', *case,
+                 lambda: stego.decode_image(stego_array, BENCH_KEY), repeat, measure_memory)
+        run_case(results, 'decode', 'png', *case,
+                 lambda: stego.decode_image(stego_png, BENCH_KEY, use_cache=False), repeat, measure_memory)
+        # Decode ulang gambar yang sama: payload diambil dari cache, hanya dekripsi
+        run_case(results, 'decode', 'cached', *case,
+                 lambda: stego.decode_image(stego_png, BENCH_KEY), repeat, measure_memory)
+        # Semua 62 kunci sekaligus dari satu ekstraksi (payload dari cache)
+        run_case(results, 'decode', 'sweep', *case,
+                 lambda: stego.sweep_decode(stego_png), repeat, measure_memory)
+
+        if routes:
+            def post_encode():
+                response = client.post('/encode', data={
+                    'message': message, 'key': str(BENCH_KEY),
+                    'image': (io.BytesIO(cover_png), 'cover.png')
+                })
+                assert response.status_code == 200, response.data[:200]
+
+            def post_decode():
+                stego.clear_payload_cache()
+                response = client.post('/decode', data={
+                    'key': str(BENCH_KEY), 'image': (io.BytesIO(stego_png), 'stego.png')
+                })
+                assert response.status_code == 200, response.data[:200]
+
+            run_case(results, 'route_encode', 'json', *case, post_encode, repeat, False)
+            run_case(results, 'route_decode', 'json', *case, post_decode, repeat, False)
+
+def environment_info():
+    """Informasi lingkungan agar hasil antar commit bisa dibandingkan"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'commit': commit or None,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pillow': PIL.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+def case_key(result):
+    return (result['stage'], result['mode'], result['cover'], result['payload_bytes'])
+
+def compare_results(baseline, results, threshold):
+    """Membandingkan p50 dengan hasil sebelumnya, mengembalikan jumlah regresi"""
+    previous = {case_key(r): r for r in baseline['results']}
+    regressions = 0
+    print(f"\nPerbandingan dengan {baseline['environment'].get('commit') or 'baseline'}:")
+    for result in results:
+        old = previous.get(case_key(result))
+        if old is None:
+            continue
+        ratio = result['latency']['p50'] / old['latency']['p50'] if old['latency']['p50'] else float('inf')
+        marker = ''
+        if ratio > threshold:
+            marker = '  <-- REGRESI'
+            regressions += 1
+        print(f"{result['stage']:<16} {result['mode']:<6} {result['cover']:<26} "
+              f"{result['payload_bytes']:>8} B  x{ratio:6.2f}{marker}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark inti steganografi')
+    parser.add_argument('--sizes', nargs='+', default=None,
+                        help="Ukuran cover sintetis, contoh: 256 1024 7680x4320")
+    parser.add_argument('--payloads', nargs='+', type=int, default=None,
+                        help='Ukuran payload dalam byte')
+    parser.add_argument('--repeat', type=int, default=5, help='Jumlah pengulangan per kasus')
+    parser.add_argument('--quick', action='store_true', help='Ukuran kecil untuk cek cepat')
+    parser.add_argument('--no-samples', action='store_true', help='Jangan pakai gambar di gambar/')
+    parser.add_argument('--no-memory', action='store_true', help='Lewati pengukuran memori')
+    parser.add_argument('--no-routes', action='store_true', help='Lewati benchmark route Flask')
+    parser.add_argument('--output', help='Simpan hasil sebagai JSON')
+    parser.add_argument('--compare', help='File JSON hasil sebelumnya untuk dibandingkan')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='Rasio p50 yang dianggap regresi saat --compare (default 1.2)')
+    args = parser.parse_args(argv)
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+    payloads = args.payloads or (QUICK_PAYLOADS if args.quick else DEFAULT_PAYLOADS)
+
+    results = []
+    for cover_name, cover in load_covers(sizes, not args.no_samples):
+        bench_cover(results, cover_name, cover, payloads, args.repeat,
+                    not args.no_memory, not args.no_routes)
+
+    report = {'environment': environment_info(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nHasil disimpan di {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare_results(baseline, results, args.threshold):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
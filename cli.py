@@ -0,0 +1,346 @@
+"""CLI non-interaktif untuk encode/decode massal di atas inti steganografi app.py.
+
+Input berupa file, glob, atau direktori (dipindai rekursif). File diproses
+paralel di beberapa proses, hasil per file ditulis sebagai JSON lines, dan
+--resume melewati file yang sudah berhasil diproses di file output.
+
+Contoh:
+    python cli.py encode gambar/ --key 7 --message "rahasia" --out-dir hasil/ --output encode.jsonl
+    python cli.py decode "hasil/*.png" --key 7 --output decode.jsonl --resume
+    python cli.py decode hasil/ --sweep --top 3
+    python cli.py capacity gambar/ --key 7
+    python cli.py quality hasil/ --against gambar/
+    python cli.py analyze unggahan/ --workers 8 --output analisis.jsonl
+"""
+import argparse
+import base64
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+import app as stego
+
+IMAGE_EXTENSIONS = ('.png', '.bmp', '.tif', '.tiff', '.webp', '.jpg', '.jpeg', '.gif')
+IN_FLIGHT_PER_WORKER = 4  # Jumlah task yang diantrikan per worker sekaligus
+
+def collect_inputs(patterns):
+    """Mengumpulkan (path, path relatif) dari file, glob, dan direktori, tanpa duplikat"""
+    inputs = []
+    seen = set()
+
+    def add(path, relative):
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            inputs.append((path, relative))
+
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, dirs, files in os.walk(pattern):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        path = os.path.join(root, name)
+                        add(path, os.path.relpath(path, pattern))
+        else:
+            matches = sorted(glob.glob(pattern, recursive=True)) or [pattern]
+            for path in matches:
+                if os.path.isfile(path) or path == pattern:
+                    add(path, os.path.basename(path))
+    return inputs
+
+def load_done(output_path):
+    """Membaca input yang sudah berhasil diproses dari file JSON lines sebelumnya"""
+    done = set()
+    if not output_path or not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Baris terakhir bisa terpotong jika proses sebelumnya dihentikan
+                continue
+            if record.get('status') == 'success':
+                done.add(record['input'])
+    return done
+
+def truncate_partial_line(output_path, chunk_size=64 * 1024):
+    """Memotong baris terakhir yang tidak diakhiri newline agar record baru tidak menempel padanya"""
+    # Baris tanpa newline berasal dari proses yang dihentikan saat menulis;
+    # load_done sudah mengabaikannya jadi inputnya tetap diproses ulang
+    if not output_path or not os.path.exists(output_path):
+        return
+    with open(output_path, 'rb+') as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - chunk_size)
+            f.seek(start)
+            chunk = f.read(position - start)
+            newline = chunk.rfind(b'\n')
+            if newline >= 0:
+                position = start + newline + 1
+                break
+            position = start
+        if position < end:
+            f.truncate(position)
+
+def write_atomic(path, data):
+    """Menulis file lewat file sementara agar tidak ada file setengah jadi"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def output_path_for(out_dir, relative, prefix, extension):
+    """Path output di out_dir dengan struktur direktori input dipertahankan"""
+    folder, name = os.path.split(relative)
+    return os.path.join(out_dir, folder, prefix + os.path.splitext(name)[0] + extension)
+
+def quiet(func, *args, **kwargs):
+    """Menjalankan func tanpa output print dari inti steganografi"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+def encode_task(path, relative, options):
+    """Worker: menyisipkan rahasia ke satu gambar dan menyimpan hasilnya"""
+    # Format keluaran dicek dari header gambar sebelum penyisipan
+    output_format = stego.output_format_for(stego.embedding_mode(stego.open_image(path)),
+                                            options['output_format'])
+    stego_image, quality = quiet(stego.encode_image, path, options['secret'], options['key'],
+                                 metrics=options['metrics'], output='image', depth=options['depth'],
+                                 compression=options['compression'],
+                                 compression_level=options['compression_level'],
+                                 filename=options['filename'], scatter=options['scatter'])
+    extension = stego.OUTPUT_FORMATS[output_format]['extension']
+    output = output_path_for(options['out_dir'], relative, 'encoded_', extension)
+    write_atomic(output, stego.image_to_bytes(stego_image, output_format, options['compress_level']))
+    record = {'output': output, 'depth': options['depth'], 'scatter': options['scatter']}
+    if quality is not None:
+        record.update(mse=float(quality['mse']), psnr=float(quality['psnr']),
+                      compression=quality['compression'], payload_bytes=quality['payload_bytes'])
+    return record
+
+def decode_task(path, relative, options):
+    """Worker: mengekstrak pesan (atau semua kandidat kunci dengan --sweep) dari satu gambar"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if options['sweep']:
+        result = quiet(stego.sweep_decode, data, top=options['top'])
+        if result is None:
+            raise ValueError('Pesan tidak ditemukan di dalam gambar')
+        if result['status'] != 'success':
+            raise ValueError(result['message'])
+        for candidate in result['candidates']:
+            if 'attachment' in candidate:
+                candidate['attachment'] = base64.b64encode(candidate.pop('attachment')).decode('ascii')
+        return {'stored_key': result['stored_key'], 'candidates': result['candidates']}
+
+    result = quiet(stego.decode_image, data, options['key'])
+    if result is None:
+        raise ValueError('Pesan tidak ditemukan di dalam gambar')
+    if result['status'] != 'success':
+        raise ValueError(result['message'])
+    record = {'message': result['message'], 'encrypted_message': result['encrypted']}
+    if 'attachment' in result:
+        record['filename'] = result['filename']
+        if options['out_dir']:
+            # Lampiran disimpan di out_dir/<nama gambar>/<nama lampiran>
+            name = os.path.basename(result['filename']) or stego.DEFAULT_ATTACHMENT_NAME
+            output = os.path.join(options['out_dir'], os.path.splitext(relative)[0], name)
+            write_atomic(output, result['attachment'])
+            record['output'] = output
+        else:
+            record['attachment'] = base64.b64encode(result['attachment']).decode('ascii')
+    return record
+
+def capacity_task(path, relative, options):
+    """Worker: menghitung kapasitas dari header gambar saja"""
+    return stego.image_capacity(path, options['key'])
+
+def quality_task(path, relative, options):
+    """Worker: menghitung MSE/PSNR gambar stego terhadap cover di --against"""
+    folder, name = os.path.split(relative)
+    candidates = [os.path.join(options['against'], relative)]
+    if name.startswith('encoded_'):
+        stem = os.path.splitext(name[len('encoded_'):])[0]
+        candidates += sorted(glob.glob(os.path.join(glob.escape(os.path.join(options['against'], folder)),
+                                                    glob.escape(stem) + '.*')))
+    cover_path = next((c for c in candidates if os.path.isfile(c)), None)
+    if cover_path is None:
+        raise ValueError('Cover tidak ditemukan di --against')
+
+    stego_img = stego.open_image(path)
+    cover_img = stego.open_image(cover_path)
+    if cover_img.mode != stego_img.mode:
+        cover_img = cover_img.convert(stego_img.mode)
+    stego_array, cover_array = np.asarray(stego_img), np.asarray(cover_img)
+    if stego_array.shape != cover_array.shape:
+        raise ValueError(f'Dimensi berbeda: cover {cover_array.shape}, stego {stego_array.shape}')
+    mse, psnr = stego.calculate_quality(cover_array, stego_array)
+    return {'cover': cover_path, 'mse': float(mse), 'psnr': float(psnr)}
+
+def analyze_task(path, relative, options):
+    """Worker: steganalisis LSB satu gambar (chi-square, RS, signature)"""
+    return stego.analyze_image(path)
+
+TASKS = {
+    'encode': encode_task,
+    'decode': decode_task,
+    'capacity': capacity_task,
+    'quality': quality_task,
+    'analyze': analyze_task
+}
+
+def run_task(command, path, relative, options):
+    """Menjalankan satu task dan membungkus hasilnya menjadi satu record JSON"""
+    start_time = time.perf_counter()
+    try:
+        record = {'input': path, 'status': 'success', **TASKS[command](path, relative, options)}
+    except Exception as e:
+        record = {'input': path, 'status': 'error', 'message': str(e)}
+    record['seconds'] = round(time.perf_counter() - start_time, 6)
+    return record
+
+def run_parallel(command, inputs, options, workers):
+    """Memproses input di process pool dengan jumlah task antre terbatas, hasil di-yield saat selesai"""
+    if workers <= 1:
+        for path, relative in inputs:
+            yield run_task(command, path, relative, options)
+        return
+    pending = iter(inputs)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = set()
+        while True:
+            while len(futures) < workers * IN_FLIGHT_PER_WORKER:
+                item = next(pending, None)
+                if item is None:
+                    break
+                futures.add(executor.submit(run_task, command, *item, options))
+            if not futures:
+                return
+            finished, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                yield future.result()
+
+def build_options(args):
+    """Menyiapkan opsi task dari argumen CLI (dikirim ke setiap worker)"""
+    options = {'key': args.key}
+    if args.command == 'encode':
+        if args.attachment:
+            with open(args.attachment, 'rb') as f:
+                secret = f.read()
+            filename = os.path.basename(args.attachment)
+        elif args.message_file:
+            with open(args.message_file, encoding='utf-8') as f:
+                secret = f.read()
+            filename = None
+        else:
+            secret, filename = args.message, None
+        options.update(secret=secret, filename=filename, out_dir=args.out_dir, metrics=args.metrics,
+                       depth=args.depth, compression=args.compression,
+                       compression_level=args.compression_level, output_format=args.output_format,
+                       compress_level=args.compress_level, scatter=args.scatter)
+    elif args.command == 'decode':
+        options.update(sweep=args.sweep, top=args.top, out_dir=args.out_dir)
+    elif args.command == 'quality':
+        options.update(against=args.against)
+    return options
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Encode/decode steganografi massal (output JSON lines)')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('inputs', nargs='+', help='File, glob, atau direktori gambar')
+    common.add_argument('--output', help='File JSON lines hasil (default stdout)')
+    common.add_argument('--resume', action='store_true',
+                        help='Lewati input yang sudah berhasil di --output dan tambahkan hasil baru')
+    common.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Jumlah proses paralel (default jumlah core)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    encode = subparsers.add_parser('encode', parents=[common], help='Sisipkan pesan ke setiap gambar')
+    encode.add_argument('--key', type=int, required=True)
+    secret = encode.add_mutually_exclusive_group(required=True)
+    secret.add_argument('--message', help='Pesan teks')
+    secret.add_argument('--message-file', help='File teks berisi pesan')
+    secret.add_argument('--attachment', help='File biner yang disisipkan sebagai lampiran')
+    encode.add_argument('--out-dir', required=True, help='Direktori gambar hasil')
+    encode.add_argument('--metrics', choices=stego.METRICS_MODES, default='fast')
+    encode.add_argument('--depth', type=int, choices=stego.LSB_DEPTHS, default=1)
+    encode.add_argument('--compression', choices=stego.COMPRESSION_MODES, default='none')
+    encode.add_argument('--compression-level', type=int, choices=stego.COMPRESSION_LEVELS,
+                        default=stego.DEFAULT_COMPRESSION_LEVEL)
+    encode.add_argument('--output-format', choices=list(stego.OUTPUT_FORMATS),
+                        help='Format gambar hasil (default STEGO_OUTPUT_FORMAT, PNG jika tidak '
+                             'bisa menyimpan mode gambar)')
+    encode.add_argument('--compress-level', type=int, choices=stego.COMPRESS_LEVELS,
+                        default=stego.OUTPUT_COMPRESS_LEVEL)
+    encode.add_argument('--scatter', action='store_true',
+                        help='Sebar payload ke posisi acak yang ditentukan kunci')
+
+    decode = subparsers.add_parser('decode', parents=[common], help='Ekstrak pesan dari setiap gambar')
+    mode = decode.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--key', type=int)
+    mode.add_argument('--sweep', action='store_true', help='Coba semua 62 kunci dan urutkan kandidat')
+    decode.add_argument('--top', type=int, default=3, help='Jumlah kandidat per gambar untuk --sweep')
+    decode.add_argument('--out-dir', help='Simpan lampiran biner di direktori ini (default base64 di JSON)')
+
+    capacity = subparsers.add_parser('capacity', parents=[common], help='Kapasitas per gambar')
+    capacity.add_argument('--key', type=int, help='Hitung juga panjang pesan maksimum untuk kunci ini')
+
+    quality = subparsers.add_parser('quality', parents=[common], help='MSE/PSNR gambar stego terhadap cover')
+    quality.add_argument('--against', required=True, help='Direktori cover asli')
+    quality.set_defaults(key=None)
+
+    analyze = subparsers.add_parser('analyze', parents=[common],
+                                    help='Deteksi penyisipan LSB (chi-square, RS) per gambar')
+    analyze.set_defaults(key=None)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == 'decode' and not 1 <= args.top <= stego.SWEEP_KEYS:
+        print(f'--top harus antara 1 dan {stego.SWEEP_KEYS}', file=sys.stderr)
+        return 2
+
+    inputs = collect_inputs(args.inputs)
+    if args.resume:
+        truncate_partial_line(args.output)
+    done = load_done(args.output) if args.resume else set()
+    todo = [(path, relative) for path, relative in inputs if path not in done]
+    print(f'{len(inputs)} gambar, {len(inputs) - len(todo)} sudah selesai, {len(todo)} diproses '
+          f'dengan {args.workers} worker', file=sys.stderr)
+
+    output = open(args.output, 'a' if args.resume else 'w', encoding='utf-8') if args.output else sys.stdout
+    errors = 0
+    start_time = time.perf_counter()
+    try:
+        for count, record in enumerate(run_parallel(args.command, todo, build_options(args), args.workers), 1):
+            # Flush per baris agar --resume bisa melanjutkan setelah proses dihentikan
+            output.write(json.dumps(record, ensure_ascii=False) + '\n')
+            output.flush()
+            errors += record['status'] != 'success'
+            if count % 100 == 0 or count == len(todo):
+                elapsed = time.perf_counter() - start_time
+                print(f'{count}/{len(todo)} selesai, {errors} gagal, {count / elapsed:.1f} gambar/detik',
+                      file=sys.stderr)
+    except BrokenPipeError:
+        # Output dipotong (misalnya | head): hentikan tanpa traceback
+        sys.stdout = open(os.devnull, 'w')
+        return 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,26 @@
+"""Konfigurasi gunicorn untuk mode produksi.
+
+Contoh:
+    gunicorn -c gunicorn.conf.py 'app:create_app()'
+"""
+import os
+
+bind = os.environ.get('STEGO_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('STEGO_WORKERS', os.cpu_count() or 1))
+# Thread tambahan melayani route ringan (/metrics, /jobs/...) dan stream
+# NDJSON batch; request berat di atas STEGO_MAX_INFLIGHT menunggu slot dulu
+worker_class = 'gthread'
+threads = int(os.environ.get('STEGO_THREADS', 4))
+timeout = int(os.environ.get('STEGO_TIMEOUT', 120))
+
+# Inti steganografi dimuat sekali di proses induk lalu dibagi ke worker lewat fork
+preload_app = True
+
+# Satu encode/decode berat per worker: CPU sudah dibagi lewat jumlah worker
+os.environ.setdefault('STEGO_MAX_INFLIGHT', '1')
+# Worker gthread tetap menerima koneksi saat sibuk, jadi request berat kedua
+# bisa jatuh ke worker yang sibuk walau worker lain kosong. Tanpa tunggu,
+# request itu langsung 503; dengan tunggu, ia antre sampai slot kosong
+os.environ.setdefault('STEGO_INFLIGHT_WAIT', '10')
+# Process pool batch per worker dibagi rata agar total proses tetap ~cpu_count
+os.environ.setdefault('STEGO_POOL_WORKERS', str(max(1, (os.cpu_count() or 1) // workers)))
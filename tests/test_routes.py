@@ -0,0 +1,64 @@
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as stego
+
+
+@pytest.fixture
+def client():
+    """Test client Flask dengan cache payload kosong"""
+    stego.clear_payload_cache()
+    return stego.create_app({'TESTING': True}, preload_core=False).test_client()
+
+
+def cover_png(width=64, height=64):
+    """Cover RGB acak sebagai bytes PNG"""
+    pixels = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def test_sweep_rejects_scattered_image(client):
+    """Sweep gambar dengan payload tersebar dijawab 400, juga saat penanda sudah di-cache"""
+    response = client.post('/encode', data={
+        'image': (io.BytesIO(cover_png()), 'cover.png'),
+        'message': 'pesan rahasia',
+        'key': '7',
+        'scatter': '1',
+        'metrics': 'none',
+        'response': 'binary'
+    })
+    assert response.status_code == 200
+    stego_png = response.data
+
+    for _ in range(2):
+        response = client.post('/decode/sweep', data={'image': (io.BytesIO(stego_png), 'stego.png')})
+        assert response.status_code == 400
+        assert response.get_json()['status'] == 'error'
+
+    # Dengan kunci, payload tersebar tetap terbaca setelah penanda di-cache
+    response = client.post('/decode', data={'image': (io.BytesIO(stego_png), 'stego.png'), 'key': '7'})
+    assert response.status_code == 200
+    assert response.get_json()['message'] == 'pesan rahasia'
+
+
+def test_decode_rejects_unknown_cipher(client):
+    """Header dengan id cipher yang tidak dikenal ditolak dengan 400, bukan didekripsi jadi sampah"""
+    pixels = np.asarray(Image.open(io.BytesIO(cover_png()))).copy()
+    stego.encode_array(pixels, 'pesan rahasia', 7, metrics='none')
+    header = stego.parse_header(stego.read_lsb_bytes(pixels, 0, stego.HEADER_SIZE))
+    stego.embed_bytes_in_array(pixels, stego.build_header(header['length'], header['flags'], cipher=9))
+    stego_png = stego.image_to_bytes(pixels)
+
+    for path, data in (('/decode', {'key': '7'}), ('/decode/sweep', {})):
+        response = client.post(path, data={'image': (io.BytesIO(stego_png), 'stego.png'), **data})
+        assert response.status_code == 400
+        assert 'cipher' in response.get_json()['message']